@@ -5,6 +5,8 @@ import sys
 __all__ = [
     "create_collection",
     "create_with_eeriecloud",
+    "geoparquet",
+    "harvest",
     "xarray_dataset_to_stac_item",
     "utils",
 ]
@@ -20,6 +22,12 @@ def __getattr__(name):
             elif name == "create_with_eeriecloud":
                 import tocatalogs.stac.create_with_eeriecloud
                 return sys.modules['tocatalogs.stac.create_with_eeriecloud']
+            elif name == "geoparquet":
+                import tocatalogs.stac.geoparquet
+                return sys.modules['tocatalogs.stac.geoparquet']
+            elif name == "harvest":
+                import tocatalogs.stac.harvest
+                return sys.modules['tocatalogs.stac.harvest']
             elif name == "xarray_dataset_to_stac_item":
                 import tocatalogs.stac.xarray_dataset_to_stac_item
                 return sys.modules['tocatalogs.stac.xarray_dataset_to_stac_item']
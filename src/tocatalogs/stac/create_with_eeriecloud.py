@@ -1,6 +1,8 @@
 from .utils.defaults import *
 from .utils.api_interaction import *
 from .create_collection import *
+from .utils.attrs import deduplicate_variable_attrs, expand_variable_attrs
+from .utils.serialize import get_item_size_report
 
 import pystac
 import fsspec
@@ -33,11 +35,29 @@ def update_eerieitem_description(item_json:dict, stac_collection_id:str)->dict:
             )
     return item_json
 
-def clean_eeriecloud_item(item_json: dict)->dict:
+def clean_eeriecloud_item(item_json: dict, l_dedup_attrs: bool = False)->dict:
     if item_json.get("default_var",None):
         del item_json["default_var"]
-    for v in list(item_json["properties"]["cube:variables"].keys()):
-        del item_json["properties"]["cube:variables"][v]["attrs"]
+    cube_variables=item_json["properties"]["cube:variables"]
+    if l_dedup_attrs:
+        common,diffs,missing=deduplicate_variable_attrs(cube_variables)
+        item_json["properties"]["cube:common_attrs"]=common
+        for v,diff in diffs.items():
+            cube_variables[v]["attrs"]=diff
+            if missing[v]:
+                cube_variables[v]["missing_attrs"]=missing[v]
+        return item_json
+    for v in list(cube_variables.keys()):
+        cube_variables[v].pop("attrs",None)
+    return item_json
+
+def expand_eeriecloud_item_attrs(item_json: dict)->dict:
+    common=item_json["properties"].pop("cube:common_attrs",None)
+    if common is None:
+        return item_json
+    for var in item_json["properties"]["cube:variables"].values():
+        if isinstance(var.get("attrs"),dict):
+            var["attrs"]=expand_variable_attrs(common,var["attrs"],var.pop("missing_attrs",None))
     return item_json
 
 def get_eeriecloud_item_title(project_id: str, exp_item: dict) -> str:
@@ -52,7 +72,12 @@ def get_eeriecloud_item_title(project_id: str, exp_item: dict) -> str:
         ititle+=defaults["STAC_ITEM_XPUBLISH_TITLE_SUFFIX"]
     return ititle
 
-def create_items_from_eeriecloud(project_id: str, filterstring: str = None) -> list:
+def create_items_from_eeriecloud(
+    project_id: str,
+    filterstring: str = None,
+    l_dedup_attrs: bool = False,
+    l_size_report: bool = True
+) -> list:
     dslist=json.load(fsspec.open(defaults["EERIE_CLOUD_URL"]).open())
     exp_items=[a for a in dslist if a.startswith(project_id.lower())]
     if project_id == "EERIE":
@@ -81,9 +106,11 @@ def create_items_from_eeriecloud(project_id: str, filterstring: str = None) -> l
         if item_providers:
             item_json["properties"]["providers"]=item_providers
         item_json["properties"]["variables"]=list(item_json["properties"]["cube:variables"].keys())
-        item_json=clean_eeriecloud_item(item_json)
+        item_json=clean_eeriecloud_item(item_json, l_dedup_attrs=l_dedup_attrs)
         item_json["links"]=[]
         items.append(item_json)
+    if l_size_report:
+        print(f"Serialized item sizes in bytes: {get_item_size_report(items)}")
     return items
 
 def create_collection_from_eerieclouditem(
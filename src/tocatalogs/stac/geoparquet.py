@@ -0,0 +1,252 @@
+import json
+import struct
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from .utils.static import get_target_fs
+
+GEOPARQUET_VERSION="1.1.0"
+STAC_GEOPARQUET_VERSION="1.0.0"
+# properties with a fixed column type, all others are inferred
+PROPERTY_TYPES={
+    "title":pa.string(),
+    "variables":pa.list_(pa.string()),
+    "keywords":pa.list_(pa.string()),
+    "zoom":pa.int32(),
+    "healpix:zooms":pa.list_(pa.int32()),
+    "time:frequency":pa.string(),
+    "time:step":pa.int64(),
+    "time:missing_steps":pa.int64(),
+    "grid:id":pa.string(),
+    "grid:ncells":pa.int64(),
+}
+DATETIME_PROPERTIES=["datetime","start_datetime","end_datetime","created","updated"]
+# link fields every links struct has, others are added if any link has them
+LINK_TYPES=dict(rel=pa.string(),href=pa.string(),type=pa.string(),title=pa.string())
+WKB_TYPES=dict(
+    Point=1,
+    LineString=2,
+    Polygon=3,
+    MultiPoint=4,
+    MultiLineString=5,
+    MultiPolygon=6,
+    GeometryCollection=7
+)
+
+def _wkb_coords(coords)->bytes:
+    return struct.pack("<I",len(coords))+b"".join(struct.pack("<2d",*coord[:2]) for coord in coords)
+
+def _wkb_body(geometry_type:str,coordinates)->bytes:
+    if geometry_type=="Point":
+        return struct.pack("<2d",*coordinates[:2])
+    if geometry_type=="LineString":
+        return _wkb_coords(coordinates)
+    if geometry_type=="Polygon":
+        return struct.pack("<I",len(coordinates))+b"".join(_wkb_coords(ring) for ring in coordinates)
+    part_type=geometry_type[len("Multi"):]
+    return struct.pack("<I",len(coordinates))+b"".join(
+        geometry_to_wkb(dict(type=part_type,coordinates=part)) for part in coordinates
+    )
+
+def geometry_to_wkb(geometry:dict)->bytes:
+    """Little-endian 2D WKB of a GeoJSON geometry."""
+    if geometry is None:
+        return None
+    geometry_type=geometry["type"]
+    if geometry_type not in WKB_TYPES:
+        raise ValueError(f"Geometry type {geometry_type} can not be written as WKB")
+    header=struct.pack("<BI",1,WKB_TYPES[geometry_type])
+    if geometry_type=="GeometryCollection":
+        return header+struct.pack("<I",len(geometry["geometries"]))+b"".join(
+            geometry_to_wkb(part) for part in geometry["geometries"]
+        )
+    return header+_wkb_body(geometry_type,geometry["coordinates"])
+
+def _to_itemdict(item)->dict:
+    return item.to_dict() if hasattr(item,"to_dict") else item
+
+def _to_json_or_none(value):
+    return None if value is None else json.dumps(value,default=str)
+
+def _is_nested(value)->bool:
+    if isinstance(value,dict):
+        return True
+    return isinstance(value,(list,tuple)) and any(isinstance(elem,(dict,list,tuple)) for elem in value)
+
+def get_property_column(name:str,values:list)->pa.Array:
+    """Typed column of one item property.
+
+    Known properties get the type of PROPERTY_TYPES, datetimes become UTC
+    timestamps. Other types are inferred by pyarrow. Nested objects, like
+    cube:variables, and mixed types are stored as JSON strings.
+    """
+    if name in DATETIME_PROPERTIES:
+        datetimes=pd.to_datetime(pd.Series(values,dtype=object),utc=True,errors="coerce",format="ISO8601")
+        # nanoseconds of harvested datetimes do not fit the microsecond column
+        return pa.array(datetimes.dt.floor("us"),type=pa.timestamp("us",tz="UTC"))
+    if name in PROPERTY_TYPES:
+        try:
+            return pa.array(values,type=PROPERTY_TYPES[name])
+        except (pa.ArrowInvalid,pa.ArrowTypeError):
+            pass
+    elif not any(_is_nested(value) for value in values):
+        try:
+            return pa.array(values)
+        except (pa.ArrowInvalid,pa.ArrowTypeError):
+            pass
+    return pa.array([_to_json_or_none(value) for value in values],type=pa.string())
+
+def get_2d_bbox(bbox:list)->list:
+    """xmin, ymin, xmax, ymax of a 2D or 3D bbox."""
+    bbox=list(bbox)
+    if len(bbox)==6:
+        return bbox[:2]+bbox[3:5]
+    if len(bbox)!=4:
+        raise ValueError(f"A bbox needs 4 or 6 values, got {bbox}")
+    return bbox
+
+def get_struct_column(records:list,types:dict=None)->pa.Array:
+    """Struct column of dicts or None with a field per key of any record.
+
+    Fields of types have that type, the others are typed like properties
+    by get_property_column, so nested objects become JSON strings.
+    """
+    types=types or {}
+    names=list(dict.fromkeys(
+        list(types)+[name for record in records if record for name in record]
+    ))
+    if not names:
+        return pa.nulls(len(records))
+    arrays=[]
+    for name in names:
+        values=[record.get(name) if record else None for record in records]
+        if name in types:
+            arrays.append(pa.array(values,type=types[name]))
+        else:
+            arrays.append(get_property_column(name,values))
+    return pa.StructArray.from_arrays(
+        arrays,names=names,mask=pa.array([record is None for record in records])
+    )
+
+def get_links_column(links:list)->pa.Array:
+    """list<struct> column of the links of every item."""
+    offsets=[0]
+    for item_links in links:
+        offsets.append(offsets[-1]+len(item_links))
+    return pa.ListArray.from_arrays(
+        pa.array(offsets,type=pa.int32()),
+        get_struct_column([link for item_links in links for link in item_links],LINK_TYPES)
+    )
+
+def get_assets_column(assets:list)->pa.Array:
+    """Struct column with a struct field per asset key of any item."""
+    keys=list(dict.fromkeys(key for item_assets in assets for key in item_assets))
+    if not keys:
+        return pa.nulls(len(assets))
+    return pa.StructArray.from_arrays(
+        [get_struct_column([item_assets.get(key) for item_assets in assets]) for key in keys],
+        names=keys
+    )
+
+def items_to_table(items:list)->pa.Table:
+    """Arrow table of STAC items in the stac-geoparquet layout.
+
+    items are item dicts or pystac Items as returned by the
+    xarray_dataset_to_stac_item builders or create_items_from_eeriecloud.
+    Properties become top level columns, the geometry WKB, links a list of
+    structs and assets a struct with a field per asset key.
+    """
+    items=[_to_itemdict(item) for item in items]
+    bboxes=[item.get("bbox") for item in items]
+    columns=dict(
+        type=pa.array([item.get("type","Feature") for item in items],type=pa.string()),
+        stac_version=pa.array([item.get("stac_version") for item in items],type=pa.string()),
+        stac_extensions=pa.array([item.get("stac_extensions",[]) for item in items],type=pa.list_(pa.string())),
+        id=pa.array([item["id"] for item in items],type=pa.string()),
+        geometry=pa.array([geometry_to_wkb(item.get("geometry")) for item in items],type=pa.binary()),
+        bbox=pa.array(
+            [dict(zip(["xmin","ymin","xmax","ymax"],get_2d_bbox(bbox))) if bbox else None for bbox in bboxes],
+            type=pa.struct([(name,pa.float64()) for name in ["xmin","ymin","xmax","ymax"]])
+        ),
+        links=get_links_column([item.get("links") or [] for item in items]),
+        assets=get_assets_column([item.get("assets") or {} for item in items]),
+        collection=pa.array([item.get("collection") for item in items],type=pa.string()),
+    )
+    names=list(dict.fromkeys(name for item in items for name in item.get("properties",{})))
+    for name in names:
+        if name in columns:
+            continue
+        columns[name]=get_property_column(name,[item.get("properties",{}).get(name) for item in items])
+    return pa.table(columns)
+
+def get_geo_metadata(table:pa.Table)->dict:
+    """GeoParquet 'geo' file metadata of the geometry column."""
+    geometry_types=set()
+    for wkb in table.column("geometry").to_pylist():
+        if wkb:
+            geometry_types.add(
+                {value:key for key,value in WKB_TYPES.items()}[struct.unpack("<I",wkb[1:5])[0]]
+            )
+    bbox=table.column("bbox")
+    extent=None
+    if bbox.null_count<len(bbox):
+        flat=bbox.combine_chunks()
+        extent=[
+            pc.min(flat.field("xmin")).as_py(),
+            pc.min(flat.field("ymin")).as_py(),
+            pc.max(flat.field("xmax")).as_py(),
+            pc.max(flat.field("ymax")).as_py()
+        ]
+    geometry=dict(encoding="WKB",geometry_types=sorted(geometry_types))
+    if extent:
+        geometry["bbox"]=extent
+    return dict(
+        version=GEOPARQUET_VERSION,
+        primary_column="geometry",
+        columns=dict(geometry=geometry)
+    )
+
+def items_to_geoparquet(
+    items:list,
+    path:str,
+    collections:dict=None,
+    partition_by:str="collection",
+    compression:str="zstd",
+    storage_options:dict=None
+)->pa.Table:
+    """Write STAC items to one stac-geoparquet file.
+
+    Items are sorted by the partition_by column and every partition, by
+    default every collection, is written as its own row group so readers
+    can skip the others by the row group statistics. collections maps
+    collection ids to collection dicts stored in the file metadata.
+    Returns the written table.
+    """
+    table=items_to_table(items)
+    if not len(table):
+        raise ValueError("There are no items to write")
+    if partition_by not in table.column_names:
+        raise ValueError(f"Cannot partition by {partition_by}, it is not a column of the items")
+    keys=table.column(partition_by).to_pylist()
+    order=sorted(range(len(keys)),key=lambda i:(keys[i] is None,str(keys[i])))
+    table=table.take(order)
+    keys=[keys[i] for i in order]
+    metadata=dict(table.schema.metadata or {})
+    metadata[b"geo"]=json.dumps(get_geo_metadata(table)).encode()
+    stac_metadata=dict(version=STAC_GEOPARQUET_VERSION)
+    if collections:
+        stac_metadata["collections"]={
+            cid:_to_itemdict(collection) for cid,collection in collections.items()
+        }
+    metadata[b"stac-geoparquet"]=json.dumps(stac_metadata,default=str).encode()
+    table=table.replace_schema_metadata(metadata)
+    fs,fs_path=get_target_fs(path,storage_options)
+    start=0
+    with fs.open(fs_path,"wb") as f:
+        with pq.ParquetWriter(f,table.schema,compression=compression) as writer:
+            for end in range(1,len(keys)+1):
+                if end==len(keys) or keys[end]!=keys[start]:
+                    writer.write_table(table.slice(start,end-start),row_group_size=end-start)
+                    start=end
+    return table
@@ -0,0 +1,180 @@
+import os
+import numpy as np
+import pandas as pd
+import xarray as xr
+from concurrent.futures import ThreadPoolExecutor
+from .utils.defaults import *
+from .utils.zarr_metadata import read_consolidated_metadata
+from .xarray_dataset_to_stac_item import (
+    get_item_config,
+    get_providers,
+    StacItemConfig,
+    SOURCE_KEYS,
+    EXPERIMENT_KEYS,
+    PROJECT_KEYS,
+    INSTITUTE_KEYS
+)
+
+HARVEST_WORKERS=16
+# same order as in misc.map_source_to_institution, first match wins
+SOURCE_INSTITUTIONS=[
+    ("icon","MPI-M"),
+    ("ifs-fesom","AWI"),
+    ("ifs-nemo","BSC"),
+    ("merra","GMAO"),
+    ("jra-3q","JMA"),
+    ("cas-esm","CAS"),
+    ("scream","E3SM-Project"),
+    ("ifs","ECMWF-DKRZ")
+]
+
+def _normalize_source(href:str)->str:
+    """The dataset source as xarray sets it in ds.encoding."""
+    if "://" in href:
+        return href
+    return os.path.abspath(os.path.expanduser(href))
+
+def _get_attrs(source,storage_options:dict=None)->dict:
+    if isinstance(source,xr.Dataset):
+        return dict(source.attrs,_source=source.encoding.get("source"))
+    if isinstance(source,str):
+        return dict(
+            read_consolidated_metadata(source,storage_options)["attrs"],
+            _source=_normalize_source(source)
+        )
+    return dict(source)
+
+def harvest_attrs(
+    sources,
+    storage_options:dict=None,
+    max_workers:int=HARVEST_WORKERS
+)->pd.DataFrame:
+    """Collect the global attributes of many datasets into one table.
+
+    sources is a list or a dict of xarray datasets, attrs dicts or zarr
+    hrefs. Hrefs are read from their consolidated metadata in parallel.
+    The '_source' column holds ds.encoding["source"], or the absolute path
+    of local hrefs as xarray would set it, so that get_item_ids matches
+    get_item_id. The index holds the dict keys.
+    """
+    index=None
+    if isinstance(sources,dict):
+        index=list(sources.keys())
+        sources=list(sources.values())
+    if any(isinstance(source,str) for source in sources):
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            records=list(pool.map(lambda source:_get_attrs(source,storage_options),sources))
+    else:
+        records=[_get_attrs(source) for source in sources]
+    return pd.DataFrame.from_records(records,index=index)
+
+def _first_of(df:pd.DataFrame,keys:list,default=None)->pd.Series:
+    """Per row the first non-null value of the columns keys."""
+    columns=[key for key in keys if key in df.columns]
+    if not columns:
+        return pd.Series(default,index=df.index,dtype=object)
+    first=df[columns[0]]
+    for column in columns[1:]:
+        first=first.where(first.notna(),df[column])
+    return first.fillna(default) if default is not None else first
+
+def map_sources_to_institutions(source_ids:pd.Series,institution_ids:pd.Series=None)->pd.Series:
+    """Vectorised misc.map_source_to_institution."""
+    lower=source_ids.fillna("").astype(str).str.lower()
+    mapped=pd.Series(
+        np.select(
+            [lower.str.contains(pattern,regex=False) for pattern,_ in SOURCE_INSTITUTIONS],
+            [institution for _,institution in SOURCE_INSTITUTIONS],
+            default=None
+        ),
+        index=source_ids.index,
+        dtype=object
+    )
+    if institution_ids is None:
+        return mapped
+    return institution_ids.where(institution_ids.notna(),mapped)
+
+def get_item_ids(df:pd.DataFrame,l_eeriecloud:bool=False,config:StacItemConfig=None)->pd.Series:
+    """Vectorised get_item_id."""
+    if l_eeriecloud:
+        if "_xpublish_id" not in df.columns or df["_xpublish_id"].isna().any():
+            raise ValueError(
+                "You set l_eeriecloud=True but there is no '_xpublish_id' attribute found which would be used as ID"
+            )
+        return df["_xpublish_id"].astype(str)
+    id_template=get_item_config(config).id_template
+    if id_template:
+        elems=id_template.split('-')
+        templated=df.reindex(columns=elems).astype(object)
+        for elem in elems:
+            templated[elem]=templated[elem].fillna(elem).astype(str)
+        item_ids=templated[elems[0]].str.cat(templated[elems[1:]],sep='-')
+    else:
+        item_ids=pd.Series("template",index=df.index)
+    if "_source" in df.columns:
+        sources=df["_source"].astype("string")
+        from_source=(
+            sources.str.replace('/','-',regex=False)
+            .str.replace(':','_',regex=False)
+            .str.replace('.','-',regex=False)
+        )
+        item_ids=from_source.where(sources.notna(),item_ids).astype(object)
+    return item_ids
+
+def get_descriptions(df:pd.DataFrame,hrefs:pd.Series=None)->pd.Series:
+    """Vectorised get_description, kept where a description attribute is set."""
+    description=(
+        "Simulation data from project '"+_first_of(df,PROJECT_KEYS,"not Set").astype(str)
+        +"' produced by Earth System Model '"+_first_of(df,SOURCE_KEYS,"not Set").astype(str)
+        +"' and run by institution '"+_first_of(df,INSTITUTE_KEYS,"not Set").astype(str)
+        +"' for the experiment '"+_first_of(df,EXPERIMENT_KEYS,"not Set").astype(str)+"'"
+    )
+    if hrefs is not None:
+        before,_,after=defaults["ITEM_SNIPPET"].partition("REPLACE_ITEMURI")
+        description=description+before+hrefs.astype(str)+after
+    if "description" in df.columns:
+        description=df["description"].where(df["description"].notna(),description)
+    return description
+
+def get_providers_column(df:pd.DataFrame,config:StacItemConfig=None)->pd.Series:
+    """get_providers once per distinct institution, looked up by category.
+
+    Rows of the same institution share one providers list.
+    """
+    inst_ids=_first_of(df,["institution_id","centre"])
+    insts=_first_of(df,["institution","centreDescription"],"N/A")
+    keys=pd.Categorical(list(zip(inst_ids.fillna("").astype(str),insts.astype(str))))
+    lookup=[
+        get_providers(
+            dict(institution_id=inst_id,institution=inst) if inst_id else dict(),
+            config
+        )
+        for inst_id,inst in keys.categories
+    ]
+    return pd.Series([lookup[code] for code in keys.codes],index=df.index,dtype=object)
+
+def derive_item_fields(
+    df:pd.DataFrame,
+    collection_id:str=None,
+    l_eeriecloud:bool=False,
+    config:StacItemConfig=None
+)->pd.DataFrame:
+    """Add item_id, title, stac_href, description, keywords, institution_id
+    and providers columns to a harvest_attrs table."""
+    config=get_item_config(config)
+    df=df.copy()
+    if "source_id" in df.columns:
+        df["institution_id"]=map_sources_to_institutions(
+            df["source_id"],df["institution_id"] if "institution_id" in df.columns else None
+        )
+    df["item_id"]=get_item_ids(df,l_eeriecloud,config)
+    title=df["title"] if "title" in df.columns else pd.Series(None,index=df.index,dtype=object)
+    df["title"]=title.where(title.notna(),df["item_id"]).astype(str)
+    if collection_id:
+        df["stac_href"]=f'{config.hosturl}/collections/{collection_id}/items/'+df["item_id"]
+    else:
+        df["stac_href"]=config.hosturl+"/"+df["item_id"]
+    df["description"]=get_descriptions(df,df["stac_href"])
+    df["keywords"]=df["title"].str.split(r"[-_]",regex=True)
+    df["providers"]=get_providers_column(df,config)
+    return df
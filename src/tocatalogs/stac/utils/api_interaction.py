@@ -1,59 +1,539 @@
+import gzip
+import json
+import os
+import threading
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from .serialize import dumps, get_content_hash
+from .json_patch import make_json_patch
+
+# items per request to the bulk_items endpoint
+BULK_BATCH_SIZE=500
+# connections kept alive per host and parallel single item requests
+POOL_SIZE=16
+# status codes of servers without the bulk transactions extension
+BULK_UNSUPPORTED=[404,405,501]
+# status codes of servers that do not accept JSON patch requests
+PATCH_UNSUPPORTED=[405,415,501]
+JSON_PATCH_MEDIA_TYPE="application/json-patch+json"
+COLLECTIONS_PAGE_SIZE=1000
+# seconds a collection index stays valid
+COLLECTION_INDEX_TTL=600
+DELETE_WORKERS=8
+
+class StacApiError(ValueError):
+    """Error response of a STAC API, with its HTTP status code."""
+    def __init__(self, message: str, status_code: int=None):
+        super().__init__(message)
+        self.status_code=status_code
+
+def get_session(pool_size:int=POOL_SIZE) -> requests.Session:
+    """Keep-alive session with a connection pool of pool_size per host."""
+    session=requests.Session()
+    adapter=HTTPAdapter(pool_connections=pool_size,pool_maxsize=pool_size)
+    session.mount("http://",adapter)
+    session.mount("https://",adapter)
+    return session
+
+def _send_json(session, method: str, url: str, json, l_gzip: bool=False, headers: dict=None):
+    if not l_gzip:
+        return session.request(method, url, json=json, headers=headers)
+    return session.request(
+        method,
+        url,
+        data=gzip.compress(dumps(json).encode()),
+        headers={"Content-Type":"application/json","Content-Encoding":"gzip",**(headers or {})}
+    )
 
 def api_delete_collection(base_url: str, cid: str):
     resp=requests.delete(f"{base_url}/collections/{cid}")
     if resp.status_code not in range(200,209):
         print(f"Status code: {resp.status_code} Cid {cid}")
-        raise ValueError(
-            f"Error deleting {cid} collection. Message: {resp.text}"
+        raise StacApiError(
+            f"Error deleting {cid} collection. Message: {resp.text}",
+            status_code=resp.status_code
         )
 def api_delete_item(base_url: str, cid: str, iid):
     resp=requests.delete(f"{base_url}/collections/{cid}/items/{iid}")
     if resp.status_code not in range(200,209):
         print(f"Status code: {resp.status_code} Cid {cid}")
-        raise ValueError(
-            f"Error deleting {iid} item from collection {cid}. Message: {resp.text}"
+        raise StacApiError(
+            f"Error deleting {iid} item from collection {cid}. Message: {resp.text}",
+            status_code=resp.status_code
         )
         
 def api_update_collection(base_url: str, cid: str, json: dict):
     resp=requests.put(f"{base_url}/collections/{cid}", json=json)
     if resp.status_code not in range(200,209):
         print(f"Status code: {resp.status_code} Cid {cid}")
-        raise ValueError(
-            f"Error updating {cid} collection. Message: {resp.text}"
+        raise StacApiError(
+            f"Error updating {cid} collection. Message: {resp.text}",
+            status_code=resp.status_code
         )
-def api_update_item(base_url: str, cid: str, iid: str, json: dict):
-    resp=requests.put(f"{base_url}/collections/{cid}/items/{iid}", json=json)
+def api_update_item(base_url: str, cid: str, iid: str, json: dict, session=None, l_gzip: bool=False):
+    resp=_send_json(session or requests, "PUT", f"{base_url}/collections/{cid}/items/{iid}", json, l_gzip)
     if resp.status_code not in range(200,209):
         print(f"Status code: {resp.status_code} Cid {cid}")
-        raise ValueError(
-            f"Error updating item {iid} from {cid} collection. Message: {resp.text}"
+        raise StacApiError(
+            f"Error updating item {iid} from {cid} collection. Message: {resp.text}",
+            status_code=resp.status_code
         )
         
 def api_create_collection(base_url: str, json: dict):
     resp=requests.post(f"{base_url}/collections", json=json)
     if resp.status_code not in range(200,209):
         #print(f"Status code: {resp.status_code} Cid {cid}")
-        raise ValueError(
-            f"Error ingesting collection. Message: {resp.text}"
+        raise StacApiError(
+            f"Error ingesting collection. Message: {resp.text}",
+            status_code=resp.status_code
         )
         
-def api_create_item(base_url: str, cid: str, json: dict):
-    resp=requests.post(f"{base_url}/collections/{cid}/items", json=json)
+def api_create_item(base_url: str, cid: str, json: dict, session=None, l_gzip: bool=False):
+    resp=_send_json(session or requests, "POST", f"{base_url}/collections/{cid}/items", json, l_gzip)
     if resp.status_code not in range(200,209):
         #print(f"Status code: {resp.status_code} Cid {cid}")
-        raise ValueError(
-            f"Error ingesting item for collection {cid}. Message: {resp.text}"
+        raise StacApiError(
+            f"Error ingesting item for collection {cid}. Message: {resp.text}",
+            status_code=resp.status_code
         )
         
 def api_create_or_update_collection(base_url: str, cid: str, json: dict):
     try:
         api_create_collection(base_url, json)
-    except:
+    except StacApiError as e:
+        if e.status_code != 409:
+            raise
         api_update_collection(base_url, cid, json)
 
 def api_create_or_update_item(base_url: str, cid: str, json: dict, iid: str = None):
     try:
         api_create_item(base_url, cid, json)
-    except:
-        api_update_item(base_url, cid, iid, json)
\ No newline at end of file
+    except StacApiError as e:
+        if e.status_code != 409:
+            raise
+        api_update_item(base_url, cid, iid or json["id"], json)
+
+class UpsertManifest:
+    """Content hash and ETag of every collection and item sent to an API.
+
+    Keys are 'cid' for collections and 'cid/iid' for items. An entry means
+    that the object exists on the server. With a path, the manifest is read
+    from and saved to a JSON file, so later runs skip unchanged objects.
+    """
+    def __init__(self, path: str=None):
+        self.path=path
+        self._lock=threading.Lock()
+        self.entries={}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.entries=json.load(f)
+
+    def get(self, key: str) -> dict:
+        with self._lock:
+            return self.entries.get(key)
+
+    def set(self, key: str, content_hash: str, etag: str=None):
+        with self._lock:
+            self.entries[key]=dict(hash=content_hash,etag=etag)
+
+    def discard(self, key: str):
+        with self._lock:
+            self.entries.pop(key,None)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            content=dumps(self.entries)
+        tmp=f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp,"w") as f:
+            f.write(content)
+        os.replace(tmp,self.path)
+
+def _upsert(
+    session,
+    create_url: str,
+    update_url: str,
+    key: str,
+    json: dict,
+    manifest: UpsertManifest,
+    l_if_match: bool=False,
+    l_gzip: bool=False
+) -> str:
+    content_hash=get_content_hash(json)
+    entry=manifest.get(key)
+    if entry and entry["hash"] == content_hash:
+        return "skipped"
+    resp=None
+    if entry:
+        headers={"If-Match":entry["etag"]} if l_if_match and entry.get("etag") else None
+        resp=_send_json(session, "PUT", update_url, json, l_gzip, headers)
+        if resp.status_code == 404:
+            # deleted on the server since the manifest was written
+            manifest.discard(key)
+            resp=None
+        else:
+            action="updated"
+    if resp is None:
+        resp=_send_json(session, "POST", create_url, json, l_gzip)
+        action="created"
+        if resp.status_code == 409:
+            resp=_send_json(session, "PUT", update_url, json, l_gzip)
+            action="updated"
+    if resp.status_code not in range(200,209):
+        raise StacApiError(
+            f"Error upserting {key}. Message: {resp.text}",
+            status_code=resp.status_code
+        )
+    manifest.set(key,content_hash,resp.headers.get("ETag"))
+    return action
+
+def api_upsert_collection(
+    base_url: str,
+    cid: str,
+    json: dict,
+    manifest: UpsertManifest,
+    session=None,
+    l_if_match: bool=False
+) -> str:
+    """Send the collection only if its content hash changed. PUT if the
+    manifest knows it exists, else POST and PUT only on 409. Returns
+    'skipped', 'created' or 'updated'."""
+    return _upsert(
+        session or requests,
+        f"{base_url}/collections",
+        f"{base_url}/collections/{cid}",
+        cid,
+        json,
+        manifest,
+        l_if_match=l_if_match
+    )
+
+def api_upsert_item(
+    base_url: str,
+    cid: str,
+    json: dict,
+    manifest: UpsertManifest,
+    session=None,
+    l_if_match: bool=False,
+    l_gzip: bool=False
+) -> str:
+    """Like api_upsert_collection for an item. With l_if_match, updates
+    send the stored ETag and fail with status 412 if the item was changed
+    by someone else in between."""
+    return _upsert(
+        session or requests,
+        f"{base_url}/collections/{cid}/items",
+        f"{base_url}/collections/{cid}/items/{json['id']}",
+        f"{cid}/{json['id']}",
+        json,
+        manifest,
+        l_if_match=l_if_match,
+        l_gzip=l_gzip
+    )
+
+def _get_common_status(statuses: list) -> int:
+    """The status of all failed requests if they agree, else None."""
+    return statuses[0] if len(set(statuses)) == 1 else None
+
+def api_upsert_items(
+    base_url: str,
+    cid: str,
+    items: list,
+    manifest: UpsertManifest,
+    session=None,
+    max_workers: int=POOL_SIZE,
+    l_if_match: bool=False,
+    l_gzip: bool=False
+) -> dict:
+    """api_upsert_item for items in parallel over one keep-alive session.
+    Saves the manifest at the end and returns the number of items per
+    action. Failed items are raised together as StacApiError."""
+    session=session or get_session(max_workers)
+    def upsert(item):
+        try:
+            return api_upsert_item(base_url, cid, item, manifest, session, l_if_match, l_gzip)
+        except StacApiError as e:
+            return e
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results=list(pool.map(upsert,items))
+    manifest.save()
+    counts=dict(skipped=0,created=0,updated=0)
+    failed={}
+    statuses=[]
+    for item,result in zip(items,results):
+        if isinstance(result,Exception):
+            failed[item["id"]]=str(result)[:200]
+            statuses.append(result.status_code)
+        else:
+            counts[result]+=1
+    if failed:
+        raise StacApiError(
+            f"Error upserting {len(failed)} of {len(items)} items for collection {cid}: {failed}",
+            status_code=_get_common_status(statuses)
+        )
+    return counts
+
+def _create_or_update_item(base_url: str, cid: str, item: dict, session, l_gzip: bool):
+    resp=_send_json(session, "POST", f"{base_url}/collections/{cid}/items", item, l_gzip)
+    if resp.status_code == 409:
+        resp=_send_json(session, "PUT", f"{base_url}/collections/{cid}/items/{item['id']}", item, l_gzip)
+    return resp
+
+def api_create_items(
+    base_url: str,
+    cid: str,
+    items: list,
+    session=None,
+    max_workers: int=POOL_SIZE,
+    l_gzip: bool=False
+) -> int:
+    """POST items one by one, max_workers at a time over one keep-alive
+    session. Existing items (409) are updated with PUT. Raises a
+    StacApiError listing all failed items after every item was tried."""
+    session=session or get_session(max_workers)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        resps=list(pool.map(
+            lambda item:_create_or_update_item(base_url, cid, item, session, l_gzip),
+            items
+        ))
+    failed_resps={
+        item["id"]:resp
+        for item,resp in zip(items,resps) if resp.status_code not in range(200,209)
+    }
+    if failed_resps:
+        failed={iid:f"{resp.status_code} {resp.text[:200]}" for iid,resp in failed_resps.items()}
+        raise StacApiError(
+            f"Error ingesting {len(failed)} of {len(items)} items for collection {cid}: {failed}",
+            status_code=_get_common_status([resp.status_code for resp in failed_resps.values()])
+        )
+    return len(items)
+
+def api_bulk_create_items(
+    base_url: str,
+    cid: str,
+    items: list,
+    batch_size: int=BULK_BATCH_SIZE,
+    method: str="upsert",
+    session=None,
+    max_workers: int=POOL_SIZE,
+    l_gzip: bool=False
+) -> dict:
+    """Ingest items through the bulk_items endpoint of the transactions
+    extension in batches of batch_size. If the server does not offer it, the
+    remaining items are sent by api_create_items. Returns the number of
+    items sent per way."""
+    session=session or get_session(max_workers)
+    items=list(items)
+    counts=dict(bulk=0,single=0)
+    for start in range(0,len(items),batch_size):
+        batch=items[start:start+batch_size]
+        resp=_send_json(
+            session,
+            "POST",
+            f"{base_url}/collections/{cid}/bulk_items",
+            dict(items={item["id"]:item for item in batch},method=method),
+            l_gzip
+        )
+        if resp.status_code in BULK_UNSUPPORTED:
+            counts["single"]=api_create_items(
+                base_url, cid, items[start:], session=session, max_workers=max_workers, l_gzip=l_gzip
+            )
+            break
+        if resp.status_code not in range(200,209):
+            raise StacApiError(
+                f"Error bulk ingesting items {start} to {start+len(batch)} for collection {cid}. Message: {resp.text}",
+                status_code=resp.status_code
+            )
+        counts["bulk"]+=len(batch)
+    return counts
+
+def api_get_item(base_url: str, cid: str, iid: str, session=None) -> dict:
+    resp=(session or requests).get(f"{base_url}/collections/{cid}/items/{iid}")
+    if resp.status_code not in range(200,209):
+        raise StacApiError(
+            f"Error getting item {iid} from {cid} collection. Message: {resp.text}",
+            status_code=resp.status_code
+        )
+    return resp.json()
+
+def api_patch_item(
+    base_url: str,
+    cid: str,
+    json: dict,
+    base: dict=None,
+    session=None
+) -> str:
+    """Update an existing item by a JSON patch (RFC 6902) against base, a
+    cached copy of the server item, or the server copy if base is None.
+    Falls back to PUT of the full item if the server does not support
+    PATCH. Returns 'unchanged', 'patched' or 'updated'."""
+    session=session or requests
+    iid=json["id"]
+    if base is None:
+        base=api_get_item(base_url, cid, iid, session=session)
+    patch=make_json_patch(base, json)
+    if not patch:
+        return "unchanged"
+    resp=session.request(
+        "PATCH",
+        f"{base_url}/collections/{cid}/items/{iid}",
+        data=dumps(patch),
+        headers={"Content-Type":JSON_PATCH_MEDIA_TYPE}
+    )
+    if resp.status_code in PATCH_UNSUPPORTED:
+        api_update_item(base_url, cid, iid, json, session=session)
+        return "updated"
+    if resp.status_code not in range(200,209):
+        raise StacApiError(
+            f"Error patching item {iid} from {cid} collection. Message: {resp.text}",
+            status_code=resp.status_code
+        )
+    return "patched"
+
+def api_patch_items(
+    base_url: str,
+    cid: str,
+    items: list,
+    bases: dict=None,
+    session=None,
+    max_workers: int=POOL_SIZE
+) -> dict:
+    """api_patch_item for items in parallel. bases maps item ids to cached
+    copies; items without one are fetched first. Returns the number of
+    items per result."""
+    session=session or get_session(max_workers)
+    bases=bases or dict()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results=list(pool.map(
+            lambda item:api_patch_item(base_url, cid, item, bases.get(item["id"]), session),
+            items
+        ))
+    return {result:results.count(result) for result in ["unchanged","patched","updated"]}
+
+def _get_next_link(page: dict) -> dict:
+    return next((link for link in page.get("links",[]) if link.get("rel") == "next"), None)
+
+def api_iter_collections(
+    base_url: str,
+    filter: str=None,
+    fields: list=None,
+    limit: int=COLLECTIONS_PAGE_SIZE,
+    session=None
+):
+    """Yield the collections of a STAC API page by page along the 'next'
+    links, so callers can stop early and never hold all collections.
+
+    With filter, a CQL2 text expression, the collection search extension
+    filters on the server. Servers without it answer with an error to the
+    filter parameters or ignore them, so callers should still check the
+    collections themselves. fields restricts the returned fields.
+    """
+    session=session or requests
+    params=dict(limit=limit)
+    if fields:
+        params["fields"]=",".join(fields)
+    if filter:
+        params.update({"filter":filter,"filter-lang":"cql2-text"})
+    resp=session.get(f"{base_url}/collections", params=params)
+    if filter and resp.status_code in [400,404,501]:
+        params.pop("filter")
+        params.pop("filter-lang")
+        resp=session.get(f"{base_url}/collections", params=params)
+    while True:
+        if resp.status_code not in range(200,209):
+            raise StacApiError(
+                f"Error listing collections. Message: {resp.text}",
+                status_code=resp.status_code
+            )
+        page=resp.json()
+        yield from page.get("collections",[])
+        link=_get_next_link(page)
+        if not link or not page.get("collections"):
+            return
+        if link.get("method","GET").upper() == "POST":
+            resp=session.post(link["href"], json=link.get("body"))
+        else:
+            resp=session.get(link["href"])
+
+_collection_index_cache={}
+_collection_index_lock=threading.Lock()
+
+def get_collection_index(
+    base_url: str,
+    ttl: float=COLLECTION_INDEX_TTL,
+    l_refresh: bool=False,
+    session=None
+) -> list:
+    """Ids and links of all collections of a STAC API, streamed with the
+    fields extension and cached for ttl seconds per base_url."""
+    with _collection_index_lock:
+        cached=_collection_index_cache.get(base_url)
+        if cached and not l_refresh and time.monotonic()-cached[0] < ttl:
+            return cached[1]
+    index=[
+        dict(id=collection["id"],links=collection.get("links",[]))
+        for collection in api_iter_collections(base_url, fields=["id","links"], session=session)
+    ]
+    with _collection_index_lock:
+        _collection_index_cache[base_url]=(time.monotonic(),index)
+    return index
+
+def api_get_collection(base_url: str, cid: str, session=None) -> dict:
+    resp=(session or requests).get(f"{base_url}/collections/{cid}")
+    if resp.status_code not in range(200,209):
+        raise StacApiError(
+            f"Error getting {cid} collection. Message: {resp.text}",
+            status_code=resp.status_code
+        )
+    return resp.json()
+
+class RateLimiter:
+    """Spaces calls of wait() by at least 1/rate seconds across threads."""
+    def __init__(self, rate: float=None):
+        self.interval=1/rate if rate else 0
+        self._lock=threading.Lock()
+        self._next=0.
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now=time.monotonic()
+            start=max(now,self._next)
+            self._next=start+self.interval
+        time.sleep(start-now)
+
+def api_delete_collections(
+    base_url: str,
+    cids: list,
+    max_workers: int=DELETE_WORKERS,
+    rate_limit: float=None,
+    session=None
+) -> dict:
+    """Delete collections in parallel with at most rate_limit requests per
+    second. Returns dict(deleted, missing, failed) where failed maps
+    collection ids to the error message."""
+    session=session or get_session(max_workers)
+    limiter=RateLimiter(rate_limit)
+    def delete(cid):
+        limiter.wait()
+        try:
+            return session.delete(f"{base_url}/collections/{cid}")
+        except requests.RequestException as e:
+            return e
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results=list(pool.map(delete,cids))
+    report=dict(deleted=[],missing=[],failed={})
+    for cid,resp in zip(cids,results):
+        if isinstance(resp,Exception):
+            report["failed"][cid]=str(resp)
+        elif resp.status_code in range(200,209):
+            report["deleted"].append(cid)
+        elif resp.status_code == 404:
+            report["missing"].append(cid)
+        else:
+            report["failed"][cid]=f"{resp.status_code} {resp.text[:200]}"
+    return report
@@ -0,0 +1,183 @@
+import asyncio
+import json
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from .api_interaction import StacApiError
+from .serialize import dumps
+
+# requests in flight per host
+HOST_CONCURRENCY = 8
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 60.0
+RETRY_STATUS = [429, 500, 502, 503, 504]
+TIMEOUT = 300
+
+
+def get_retry_after(value: str) -> float:
+    """Seconds to wait from a Retry-After header, in seconds or as HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def get_backoff(attempt: int, base: float = BACKOFF_BASE, maximum: float = BACKOFF_MAX) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(maximum, base * 2**attempt))
+
+
+class AsyncStacClient:
+    """Async client for the STAC API transactions extension.
+
+    At most host_concurrency requests are in flight per host. Responses
+    with a status in RETRY_STATUS and connection errors are retried up to
+    max_retries times, waiting as long as the Retry-After header says or
+    with exponential backoff. Other non-2xx responses raise StacApiError.
+
+    Use it as async context manager:
+
+        async with AsyncStacClient(base_url) as client:
+            await client.create_or_update_item(cid, item)
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        host_concurrency: int = HOST_CONCURRENCY,
+        max_retries: int = MAX_RETRIES,
+        backoff_base: float = BACKOFF_BASE,
+        backoff_max: float = BACKOFF_MAX,
+        timeout: float = TIMEOUT,
+        session: aiohttp.ClientSession = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.host_concurrency = host_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.session = session
+        self._own_session = session is None
+        self._semaphores = {}
+
+    async def __aenter__(self):
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                json_serialize=dumps,
+            )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        if self._own_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _get_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.host_concurrency)
+        return self._semaphores[host]
+
+    async def request(self, method: str, path: str, json=None, ok_status: list = None):
+        """Send a request with retries and return the decoded JSON body or
+        None. Statuses in ok_status count as success in addition to 2xx."""
+        url = f"{self.base_url}{path}"
+        ok_status = ok_status or []
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                async with self._get_semaphore(url):
+                    async with self.session.request(method, url, json=json) as resp:
+                        status = resp.status
+                        text = await resp.text()
+                        retry_after = get_retry_after(resp.headers.get("Retry-After"))
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt == self.max_retries:
+                    raise StacApiError(f"{method} {url} failed: {e}") from e
+                await asyncio.sleep(get_backoff(attempt, self.backoff_base, self.backoff_max))
+                continue
+            if status in range(200, 300) or status in ok_status:
+                return self._decode(text)
+            if status not in RETRY_STATUS or attempt == self.max_retries:
+                raise StacApiError(
+                    f"{method} {url} failed with status {status}. Message: {text}",
+                    status_code=status,
+                )
+            if retry_after is None:
+                retry_after = get_backoff(attempt, self.backoff_base, self.backoff_max)
+            await asyncio.sleep(min(retry_after, self.backoff_max))
+
+    @staticmethod
+    def _decode(text: str):
+        if not text:
+            return None
+        try:
+            return json.loads(text)
+        except ValueError:
+            return text
+
+    async def create_collection(self, json: dict):
+        return await self.request("POST", "/collections", json=json)
+
+    async def update_collection(self, cid: str, json: dict):
+        return await self.request("PUT", f"/collections/{cid}", json=json)
+
+    async def delete_collection(self, cid: str):
+        return await self.request("DELETE", f"/collections/{cid}")
+
+    async def create_item(self, cid: str, json: dict):
+        return await self.request("POST", f"/collections/{cid}/items", json=json)
+
+    async def update_item(self, cid: str, iid: str, json: dict):
+        return await self.request("PUT", f"/collections/{cid}/items/{iid}", json=json)
+
+    async def delete_item(self, cid: str, iid: str):
+        return await self.request("DELETE", f"/collections/{cid}/items/{iid}")
+
+    async def create_or_update_collection(self, cid: str, json: dict):
+        """POST the collection and PUT it if it already exists (409)."""
+        try:
+            return await self.create_collection(json)
+        except StacApiError as e:
+            if e.status_code != 409:
+                raise
+        return await self.update_collection(cid, json)
+
+    async def create_or_update_item(self, cid: str, json: dict, iid: str = None):
+        """POST the item and PUT it if it already exists (409)."""
+        try:
+            return await self.create_item(cid, json)
+        except StacApiError as e:
+            if e.status_code != 409:
+                raise
+        return await self.update_item(cid, iid or json["id"], json)
+
+    async def create_or_update_items(self, cid: str, items: list) -> dict:
+        """create_or_update_item for all items at once, bounded by the host
+        concurrency. Returns the errors by item id."""
+        results = await asyncio.gather(
+            *[self.create_or_update_item(cid, item) for item in items],
+            return_exceptions=True,
+        )
+        return {
+            item["id"]: result
+            for item, result in zip(items, results)
+            if isinstance(result, Exception)
+        }
@@ -0,0 +1,78 @@
+import json
+from collections import Counter
+
+
+def _value_key(value) -> str:
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def deduplicate_variable_attrs(variables: dict, min_share: float = 0.5) -> tuple:
+    """Split per-variable attrs into common attrs and per-variable differences.
+
+    variables maps variable names to dicts with an "attrs" entry, as in
+    cube:variables. An attribute becomes common if more than min_share of
+    the variables carry the same value. Returns the common attrs, the
+    per-variable attrs that differ from them and per variable the list of
+    common keys that the variable does not have.
+    """
+    with_attrs = {name: var["attrs"] for name, var in variables.items() if isinstance(var.get("attrs"), dict)}
+    if not with_attrs:
+        return {}, {}, {}
+    counts = Counter(
+        (key, _value_key(value)) for attrs in with_attrs.values() for key, value in attrs.items()
+    )
+    common = {}
+    common_keys = {}
+    for (key, value_key), count in counts.most_common():
+        if key in common_keys or count < 2 or count <= min_share * len(with_attrs):
+            continue
+        common_keys[key] = value_key
+    for attrs in with_attrs.values():
+        for key, value in attrs.items():
+            if common_keys.get(key) == _value_key(value) and key not in common:
+                common[key] = value
+    diffs = {}
+    missing = {}
+    for name, attrs in with_attrs.items():
+        diffs[name] = {
+            key: value for key, value in attrs.items()
+            if common_keys.get(key) != _value_key(value)
+        }
+        missing[name] = [key for key in common if key not in attrs]
+    return common, diffs, missing
+
+
+def expand_variable_attrs(common: dict, diff: dict, missing: list = None) -> dict:
+    """Inverse of deduplicate_variable_attrs for one variable."""
+    attrs = {key: value for key, value in common.items() if key not in (missing or [])}
+    attrs.update(diff)
+    return attrs
+
+
+def get_attr_nbytes(value) -> int:
+    return len(json.dumps(value, default=str).encode())
+
+
+def split_oversized_attrs(attrs: dict, max_attr_bytes: int = None, max_attrs_bytes: int = None) -> tuple:
+    """Split attrs into the ones to keep and the ones to externalize.
+
+    Attributes above max_attr_bytes are externalized. If the kept ones still
+    exceed max_attrs_bytes in total, the largest are externalized until
+    they fit.
+    """
+    if not max_attr_bytes and not max_attrs_bytes:
+        return dict(attrs), {}
+    sizes = {key: get_attr_nbytes(value) for key, value in attrs.items()}
+    externalized = set()
+    if max_attr_bytes:
+        externalized.update(key for key, size in sizes.items() if size > max_attr_bytes)
+    if max_attrs_bytes:
+        total = sum(size for key, size in sizes.items() if key not in externalized)
+        for key in sorted(sizes, key=sizes.get, reverse=True):
+            if total <= max_attrs_bytes:
+                break
+            if key not in externalized:
+                externalized.add(key)
+                total -= sizes[key]
+    kept = {key: value for key, value in attrs.items() if key not in externalized}
+    return kept, {key: value for key, value in attrs.items() if key in externalized}
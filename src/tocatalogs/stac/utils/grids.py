@@ -0,0 +1,101 @@
+import json
+import os
+import threading
+
+from .serialize import dumps
+
+# attributes that identify a horizontal grid, first found wins
+GRID_ID_ATTRS = ["uuidOfHGrid", "grid_uuid", "grid_hash"]
+GRID_CACHE_ENV = "TOCATALOGS_GRID_CACHE"
+
+
+def get_grid_key(ds) -> str:
+    """Grid identifier from the global, coordinate or first data variable
+    attrs, or None."""
+    names = list(ds.coords) + list(ds.data_vars)[:1]
+    for attrs in [ds.attrs] + [ds.variables[name].attrs for name in names]:
+        for key in GRID_ID_ATTRS:
+            if attrs.get(key):
+                return f"{key}:{attrs[key]}"
+    return None
+
+
+def get_grid_ncells(ds) -> int:
+    """Number of horizontal cells from the dimensions of lat and lon."""
+    dims = set()
+    for name in ["lat", "lon", "clat", "clon", "latitude", "longitude"]:
+        if name in ds.variables:
+            dims.update(ds.variables[name].dims)
+    if not dims:
+        return None
+    ncells = 1
+    for dim in dims:
+        ncells *= int(ds.sizes[dim])
+    return ncells
+
+
+class GridRegistry:
+    """Grid extents, cell counts and grid stores, computed once per grid.
+
+    With a path, entries are read from and written to a JSON file so that
+    later runs reuse them. Access is guarded by a lock so one registry can be
+    shared by item-building threads.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._grids = self._read()
+
+    def _read(self) -> dict:
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        with open(self.path) as f:
+            return json.load(f)
+
+    def _write(self):
+        if not self.path:
+            return
+        grids = self._read()
+        grids.update(self._grids)
+        self._grids = grids
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                f.write(dumps(grids, indent=1))
+            os.replace(tmp, self.path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._grids
+
+    def get(self, key: str) -> dict:
+        with self._lock:
+            return dict(self._grids.get(key, {}))
+
+    def update(self, key: str, **info) -> dict:
+        """Add info to the entry of key and persist it."""
+        with self._lock:
+            entry = self._grids.setdefault(key, {})
+            if all(entry.get(name) == value for name, value in info.items()):
+                return dict(entry)
+            entry.update(info)
+            self._write()
+            return dict(entry)
+
+    def get_or_compute(self, key: str, name: str, compute):
+        """The cached value name of key, from compute() on the first call."""
+        value = self.get(key).get(name)
+        if value is None:
+            value = compute()
+            self.update(key, **{name: value})
+        return value
+
+
+DEFAULT_GRID_REGISTRY = GridRegistry(os.environ.get(GRID_CACHE_ENV))
@@ -0,0 +1,88 @@
+from copy import deepcopy
+
+
+def escape_pointer_token(token) -> str:
+    """Escape a key for a JSON pointer (RFC 6901)."""
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def unescape_pointer_token(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def make_json_patch(source, target, path: str = "") -> list:
+    """Minimal RFC 6902 patch that turns source into target.
+
+    Dicts are compared key by key and recursed into. Lists of equal length
+    are compared element by element, lists that only grew or shrank at the
+    end get add or remove operations for the tail. Everything else that
+    differs is replaced as a whole.
+    """
+    if type(source) is not type(target) and not (
+        type(source) in (int, float) and type(target) in (int, float)
+    ):
+        return [dict(op="replace", path=path, value=deepcopy(target))]
+    if isinstance(source, dict):
+        patch = []
+        for key in source:
+            if key not in target:
+                patch.append(dict(op="remove", path=f"{path}/{escape_pointer_token(key)}"))
+        for key, value in target.items():
+            key_path = f"{path}/{escape_pointer_token(key)}"
+            if key not in source:
+                patch.append(dict(op="add", path=key_path, value=deepcopy(value)))
+            elif source[key] != value or type(source[key]) is not type(value):
+                patch.extend(make_json_patch(source[key], value, key_path))
+        return patch
+    if isinstance(source, list):
+        common = min(len(source), len(target))
+        if source[:common] != target[:common] and len(source) != len(target):
+            return [dict(op="replace", path=path, value=deepcopy(target))]
+        patch = []
+        for index in range(common):
+            if source[index] != target[index] or type(source[index]) is not type(target[index]):
+                patch.extend(make_json_patch(source[index], target[index], f"{path}/{index}"))
+        for index in range(len(source) - 1, common - 1, -1):
+            patch.append(dict(op="remove", path=f"{path}/{index}"))
+        for value in target[common:]:
+            patch.append(dict(op="add", path=f"{path}/-", value=deepcopy(value)))
+        return patch
+    if source != target:
+        return [dict(op="replace", path=path, value=deepcopy(target))]
+    return []
+
+
+def _resolve(doc, tokens: list):
+    for token in tokens:
+        doc = doc[int(token)] if isinstance(doc, list) else doc[unescape_pointer_token(token)]
+    return doc
+
+
+def apply_json_patch(doc, patch: list):
+    """Apply the add, remove and replace operations of an RFC 6902 patch
+    to a copy of doc, e.g. to keep a cached server copy up to date."""
+    doc = deepcopy(doc)
+    for operation in patch:
+        tokens = operation["path"].split("/")[1:]
+        if not tokens:
+            doc = deepcopy(operation["value"])
+            continue
+        parent = _resolve(doc, tokens[:-1])
+        last = tokens[-1]
+        op = operation["op"]
+        if op not in ["add", "remove", "replace"]:
+            raise ValueError(f"JSON patch operation {op} is not supported")
+        if isinstance(parent, list):
+            if op == "remove":
+                del parent[int(last)]
+            elif op == "add" and last == "-":
+                parent.append(deepcopy(operation["value"]))
+            elif op == "add":
+                parent.insert(int(last), deepcopy(operation["value"]))
+            else:
+                parent[int(last)] = deepcopy(operation["value"])
+        elif op == "remove":
+            del parent[unescape_pointer_token(last)]
+        else:
+            parent[unescape_pointer_token(last)] = deepcopy(operation["value"])
+    return doc
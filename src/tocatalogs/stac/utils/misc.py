@@ -3,6 +3,7 @@ import fsspec
 import json
 from .api_interaction import *
 from .defaults import *
+from .static import write_static_stac, STATIC_WRITERS
 import math
 import itertools
 
@@ -67,16 +68,15 @@ def create_main(
     description:str,
     keywords:list,
     template:dict=None,
+    ttl:float=COLLECTION_INDEX_TTL
 ):
-    from pystac_client import Client as psc
-    cat=psc.open(defaults["STAC_API_URL"])
     cols=[
         a
-        for a in list(cat.get_collections())
-        if any(b in a.id and a.id != main_id for b in pattern_strings )
+        for a in get_collection_index(defaults["STAC_API_URL"],ttl=ttl)
+        if any(b in a["id"] and a["id"] != main_id for b in pattern_strings )
     ]
     print("Found "+str(len(cols))+" collections")
-    main_collection=template if template else cols[0].to_dict()    
+    main_collection=template if template else api_get_collection(defaults["STAC_API_URL"],cols[0]["id"])
     main_collection.update(dict(
         id=main_id,
         title=title,
@@ -86,13 +86,12 @@ def create_main(
     
     main_collection["links"]=[]
     for col in cols:
-        coldict=col.to_dict()
-        for childidx,child in enumerate(coldict["links"]):
+        for child in col["links"]:
             if child["rel"]=="self":
                 main_collection["links"].append(
                     {
                         "rel":"child",
-                        "href":f'{coldict["links"][childidx]["href"].replace(defaults["STAC_API_URL"],defaults["STAC_API_URL_EXT"])}',
+                        "href":f'{child["href"].replace(defaults["STAC_API_URL"],defaults["STAC_API_URL_EXT"])}',
                         "type":"application/json"
                     }
         )    
@@ -108,7 +107,14 @@ def link_and_dump_static_stacs(
     project_id:str,
     bucket:str="",
     l_orcestra:bool=False,
+    storage_options:dict=None,
+    max_workers:int=STATIC_WRITERS,
+    page_size:int=None,
+    l_minify:bool=False,
+    l_gzip:bool=False,
+    l_incremental:bool=False
 ):
+    item_files=dict()
     for item_json in items:
         item_json["properties"]["description"]=item_json["properties"]["description"].replace(
             "https://eerie.cloud.dkrz.de/datasets/",
@@ -134,23 +140,18 @@ def link_and_dump_static_stacs(
                 "title": item_json["properties"]["title"]
             }
         )
+        item_files[fn]=item_json
 
-        json.dump(
-            item_json,
-            fsspec.open(
-                fn,
-                "w"
-            ).open(),
-            indent=4
-        )
-
-    json.dump(
+    write_static_stac(
+        item_files,
+        f"{project_id}-stac_items/collection.json",
         collection,
-        fsspec.open(
-            f"{project_id}-stac_items/collection.json",
-            "w"
-        ).open(),
-        indent=4
+        storage_options=storage_options,
+        max_workers=max_workers,
+        indent=None if l_minify else 4,
+        page_size=page_size,
+        l_gzip=l_gzip,
+        l_incremental=l_incremental
     )
 
 def get_and_set_zoom(item_json:dict)->dict:
@@ -206,21 +207,35 @@ def set_version_from_date():
     dnow=datetime.datetime.now()
     return "v"+dnow.strftime("%Y%m%d")
 
+def escape_like_pattern(value:str)->str:
+    """Escape the CQL2 LIKE wildcards % and _ with a backslash."""
+    return value.replace("\\","\\\\").replace("%","\\%").replace("_","\\_")
 
-def delete_all_collections_by_prefix(stac_base_url: str, start_string: str):
-    from pystac_client import Client as psc
-    cat=psc.open(stac_base_url)
+
+def delete_all_collections_by_prefix(
+    stac_base_url: str,
+    start_string: str,
+    max_workers: int=DELETE_WORKERS,
+    rate_limit: float=None
+) -> dict:
+    prefixes=list(dict.fromkeys([start_string,start_string.lower()]))
+    cql2=" OR ".join(
+        "id LIKE '"+escape_like_pattern(prefix).replace("'","''")+"%'" for prefix in prefixes
+    )
     xp_exps=[
-        a
-        for a in list(cat.get_all_collections())
-        if a.id.startswith(start_string) or a.id.startswith(start_string.lower())
+        collection["id"]
+        for collection in api_iter_collections(stac_base_url,filter=cql2,fields=["id"])
+        if any(collection["id"].startswith(prefix) for prefix in prefixes)
     ]
     print(f"Delete {len(xp_exps)} collections")
-    for xp_exp in xp_exps:
-        try:
-            api_delete_collection(stac_base_url,xp_exp.id)
-        except:
-            print("Not found anymore: "+xp_exp.id)
+    report=api_delete_collections(
+        stac_base_url,xp_exps,max_workers=max_workers,rate_limit=rate_limit
+    )
+    for cid in report["missing"]:
+        print("Not found anymore: "+cid)
+    for cid,message in report["failed"].items():
+        print(f"Could not delete {cid}: {message}")
+    return report
             
 def map_source_to_institution(local_conf: dict):
     if not local_conf.get("institution_id",None):
@@ -0,0 +1,193 @@
+import hashlib
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from functools import singledispatch
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_BACKENDS = ["json", "orjson"]
+
+
+JSON_SCALARS = (str, int, float, bool, type(None))
+
+
+def to_jsonable(obj):
+    """Convert obj into plain JSON types (dict, list, str, int, float, bool, None)."""
+    # exact type checks first, singledispatch is slow for the many plain leaves
+    obj_type = type(obj)
+    if obj_type in JSON_SCALARS:
+        return obj
+    if obj_type is dict:
+        return {
+            (key if type(key) is str else str(to_jsonable(key))): to_jsonable(value)
+            for key, value in obj.items()
+        }
+    if obj_type is list:
+        return [to_jsonable(value) for value in obj]
+    return _to_jsonable(obj)
+
+
+@singledispatch
+def _to_jsonable(obj):
+    if hasattr(obj, "isoformat"):
+        # cftime.datetime and other datetime-likes
+        return obj.isoformat()
+    return str(obj)
+
+
+@_to_jsonable.register(str)
+@_to_jsonable.register(int)
+@_to_jsonable.register(float)
+@_to_jsonable.register(type(None))
+def _(obj):
+    return obj
+
+
+@_to_jsonable.register(dict)
+def _(obj):
+    return {
+        (key if isinstance(key, str) else str(to_jsonable(key))): to_jsonable(value)
+        for key, value in obj.items()
+    }
+
+
+@_to_jsonable.register(list)
+@_to_jsonable.register(tuple)
+@_to_jsonable.register(set)
+@_to_jsonable.register(frozenset)
+def _(obj):
+    return [to_jsonable(value) for value in obj]
+
+
+@_to_jsonable.register(bytes)
+@_to_jsonable.register(bytearray)
+def _(obj):
+    return bytes(obj).decode(errors="ignore")
+
+
+@_to_jsonable.register(datetime)
+@_to_jsonable.register(date)
+@_to_jsonable.register(time)
+def _(obj):
+    return obj.isoformat()
+
+
+@_to_jsonable.register(timedelta)
+def _(obj):
+    return str(obj)
+
+
+@_to_jsonable.register(Decimal)
+def _(obj):
+    return float(obj)
+
+
+@_to_jsonable.register(np.generic)
+def _(obj):
+    return to_jsonable(obj.item())
+
+
+def _datetime64_to_jsonable(obj):
+    # as orjson writes them: microseconds at most, NaT as null
+    return to_jsonable(np.asarray(obj).astype("datetime64[us]").astype(object).tolist())
+
+
+@_to_jsonable.register(np.datetime64)
+def _(obj):
+    return _datetime64_to_jsonable(obj)
+
+
+@_to_jsonable.register(np.timedelta64)
+def _(obj):
+    return str(obj)
+
+
+@_to_jsonable.register(np.ndarray)
+def _(obj):
+    if obj.dtype.kind in "biuf":
+        return obj.tolist()
+    if obj.dtype.kind == "M":
+        return _datetime64_to_jsonable(obj)
+    if obj.dtype.kind == "m":
+        return to_jsonable(obj.astype("timedelta64[us]").astype(object).tolist())
+    return [to_jsonable(value) for value in obj.tolist()]
+
+
+def _orjson_default(obj):
+    converted = to_jsonable(obj)
+    if converted is obj:
+        raise TypeError(f"Type {type(obj)} not serializable")
+    return converted
+
+
+ORJSON_OPTIONS = (
+    orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS if orjson else None
+)
+
+
+def get_json_backend(backend: str = None) -> str:
+    if not backend:
+        return "orjson" if orjson else "json"
+    if backend not in JSON_BACKENDS:
+        raise ValueError(f"Unknown json backend {backend}. Choose one of {JSON_BACKENDS}")
+    if backend == "orjson" and not orjson:
+        raise ValueError("The 'orjson' backend requires orjson. Install it with: pip install orjson")
+    return backend
+
+
+def dumps(obj, backend: str = None, indent: int = None) -> str:
+    """Serialize obj to a JSON string.
+
+    Without backend, orjson is used if it is installed and json otherwise;
+    pass backend="json" for output independent of the environment. orjson
+    only indents by 2, so any other indent is written by json.
+    """
+    if get_json_backend(backend) == "orjson" and indent in [None, 0, 2]:
+        option = ORJSON_OPTIONS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_orjson_default, option=option).decode()
+    return json.dumps(to_jsonable(obj), indent=indent)
+
+
+def make_json_serializable(obj, backend: str = "json"):
+    """Recursively convert non-JSON serializable values to serializable formats.
+
+    With backend="orjson", numpy arrays and scalars are converted natively by
+    an orjson round trip. Note that orjson writes NaN as null.
+    """
+    if get_json_backend(backend) == "orjson":
+        return orjson.loads(orjson.dumps(obj, default=_orjson_default, option=ORJSON_OPTIONS))
+    return to_jsonable(obj)
+
+
+def get_content_hash(obj) -> str:
+    """sha256 of obj serialized with sorted keys, independent of key order."""
+    content = json.dumps(to_jsonable(obj), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def get_item_size_report(items: list, backend: str = None) -> dict:
+    """Distribution of the serialized sizes of items in bytes."""
+    sizes = np.array([len(dumps(item, backend=backend).encode()) for item in items])
+    if not len(sizes):
+        return dict(count=0)
+    report = dict(
+        count=int(len(sizes)),
+        total=int(sizes.sum()),
+        min=int(sizes.min()),
+        mean=float(sizes.mean()),
+        max=int(sizes.max()),
+    )
+    for quantile in [50, 90, 99]:
+        report[f"p{quantile}"] = float(np.percentile(sizes, quantile))
+    report["largest"] = [
+        items[i].get("id") for i in np.argsort(sizes)[::-1][:5] if isinstance(items[i], dict)
+    ]
+    return report
@@ -0,0 +1,264 @@
+import gzip
+import json
+import posixpath
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import fsspec
+
+from .serialize import dumps, get_content_hash
+
+STATIC_WRITERS = 16
+# files written per task of the thread pool
+WRITE_BATCH_SIZE = 64
+# item links per page of a paginated collection
+ITEMS_PER_PAGE = 1000
+PAGE_DIRECTORY = "items"
+# content hashes of the files of an incremental export, next to collection.json
+STATIC_MANIFEST = "stac-manifest.json"
+# a single PUT is atomic on object stores, no temporary file needed
+OBJECT_STORE_PROTOCOLS = ["s3", "s3a", "gs", "gcs", "abfs", "az", "adl"]
+
+
+def get_target_fs(path: str, storage_options: dict = None) -> tuple:
+    """fsspec filesystem and path without protocol for any fsspec url."""
+    return fsspec.core.url_to_fs(path, **(storage_options or {}))
+
+
+def _is_object_store(fs) -> bool:
+    protocols = fs.protocol if isinstance(fs.protocol, (tuple, list)) else [fs.protocol]
+    return any(protocol in OBJECT_STORE_PROTOCOLS for protocol in protocols)
+
+
+def _write_content(fs, path: str, content: str, l_gzip: bool = False):
+    with fs.open(path, "w") as f:
+        f.write(content)
+    if l_gzip:
+        with fs.open(path + ".gz", "wb") as f:
+            f.write(gzip.compress(content.encode()))
+
+
+def write_json(fs, path: str, obj, indent: int = None, json_backend: str = None, l_gzip: bool = False):
+    """Write obj as JSON and close the file handle. With l_gzip, a
+    precompressed .json.gz sibling is written as well."""
+    _write_content(fs, path, dumps(obj, backend=json_backend, indent=indent), l_gzip)
+
+
+def write_json_atomic(
+    fs, path: str, obj, indent: int = None, json_backend: str = None, l_gzip: bool = False
+):
+    """Write obj so that readers see either the old or the complete new
+    file: via a temporary file and a rename, or by one PUT on object
+    stores."""
+    if _is_object_store(fs):
+        write_json(fs, path, obj, indent=indent, json_backend=json_backend, l_gzip=l_gzip)
+        return
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    write_json(fs, tmp, obj, indent=indent, json_backend=json_backend, l_gzip=l_gzip)
+    try:
+        if l_gzip:
+            fs.mv(tmp + ".gz", path + ".gz")
+        fs.mv(tmp, path)
+    except Exception:
+        fs.rm([name for name in [tmp, tmp + ".gz"] if fs.exists(name)])
+        raise
+
+
+def _rebase_href(href: str, directory: str) -> str:
+    """href relative to the collection as seen from directory below it.
+    Absolute paths and urls are kept."""
+    if "://" in href or href.startswith("/"):
+        return href
+    return posixpath.relpath(href, directory)
+
+
+def paginate_collection(
+    collection: dict,
+    page_size: int = ITEMS_PER_PAGE,
+    page_directory: str = PAGE_DIRECTORY,
+    collection_name: str = "collection.json",
+) -> tuple:
+    """Move the item links of collection into child catalogs of page_size
+    links each. The pages link each other with next and prev, so clients
+    can walk them in order or open any of them directly.
+
+    collection_name is the file name of the collection. Relative hrefs of
+    the item links and of the root link are rebased to page_directory.
+    Returns the collection with child links instead of item links and a
+    dict of page catalogs by their path relative to the collection.
+    """
+    item_links = [link for link in collection.get("links", []) if link.get("rel") == "item"]
+    collection = dict(
+        collection, links=[link for link in collection.get("links", []) if link.get("rel") != "item"]
+    )
+    parent_href = _rebase_href(collection_name, page_directory)
+    root_href = next(
+        (link["href"] for link in collection["links"] if link.get("rel") == "root"), collection_name
+    )
+    root_href = _rebase_href(root_href, page_directory)
+    npages = -(-len(item_links) // page_size)
+    names = [f"{page_directory}/page-{page + 1:05d}.json" for page in range(npages)]
+    pages = {}
+    for page, name in enumerate(names):
+        links = [
+            dict(rel="root", href=root_href, type="application/json"),
+            dict(rel="parent", href=parent_href, type="application/json"),
+        ]
+        if page > 0:
+            links.append(dict(rel="prev", href=posixpath.basename(names[page - 1]), type="application/json"))
+        if page < npages - 1:
+            links.append(dict(rel="next", href=posixpath.basename(names[page + 1]), type="application/json"))
+        page_links = [
+            dict(link, href=_rebase_href(link["href"], page_directory))
+            for link in item_links[page * page_size : (page + 1) * page_size]
+        ]
+        links.extend(page_links)
+        first = page * page_size + 1
+        pages[name] = dict(
+            type="Catalog",
+            stac_version=collection.get("stac_version", "1.0.0"),
+            id=f"{collection['id']}-items-{page + 1}",
+            description=f"Items {first} to {first + len(page_links) - 1} of {collection['id']}",
+            links=links,
+        )
+        collection["links"].append(
+            dict(rel="child", href=name, type="application/json", title=f"Items page {page + 1}")
+        )
+    return collection, pages
+
+
+def _write_batch(fs, batch: list, indent: int, json_backend: str, l_gzip: bool):
+    errors = {}
+    for path, obj in batch:
+        try:
+            write_json(fs, path, obj, indent=indent, json_backend=json_backend, l_gzip=l_gzip)
+        except Exception as e:
+            errors[path] = e
+    return errors
+
+
+def read_static_manifest(fs, path: str) -> dict:
+    """The manifest of a previous export at path, or an empty one."""
+    try:
+        with fs.open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return dict(files={})
+
+
+def _remove_files(fs, paths: list, l_gzip: bool):
+    names = list(paths) + ([path + ".gz" for path in paths] if l_gzip else [])
+    for name in names:
+        try:
+            fs.rm_file(name)
+        except FileNotFoundError:
+            pass
+
+
+def write_static_stac(
+    items: dict,
+    collection_path: str,
+    collection: dict,
+    storage_options: dict = None,
+    max_workers: int = STATIC_WRITERS,
+    batch_size: int = WRITE_BATCH_SIZE,
+    indent: int = 4,
+    json_backend: str = None,
+    page_size: int = None,
+    l_gzip: bool = False,
+    l_incremental: bool = False,
+) -> int:
+    """Write a static collection with its items to any fsspec target.
+
+    items maps item paths to item dicts. Paths are relative to the current
+    directory or urls of the same filesystem as collection_path. Items are
+    written in batches by a thread pool. collection.json is published
+    atomically and only after all items were written; if any item fails, a
+    ValueError is raised and the collection is not written. Returns the
+    number of written items.
+
+    With page_size, the item links are moved to paginated child catalogs
+    (see paginate_collection) so that collection.json stays small. indent
+    None writes minified JSON and l_gzip adds .json.gz siblings.
+
+    With l_incremental, content hashes of all written files are kept in
+    STATIC_MANIFEST next to collection.json. A rebuild then only writes
+    added or changed files, including collection.json, and deletes the
+    files of removed items after the collection was published. The target
+    is not checked against the manifest, so files changed or deleted by
+    other means are only repaired by a run without l_incremental.
+    """
+    fs, collection_fs_path = get_target_fs(collection_path, storage_options)
+    item_paths = {fs._strip_protocol(path) for path in items}
+    manifest_path = posixpath.join(posixpath.dirname(collection_fs_path), STATIC_MANIFEST)
+    if page_size:
+        collection, pages = paginate_collection(
+            collection, page_size, collection_name=posixpath.basename(collection_fs_path)
+        )
+        collection_dir = posixpath.dirname(collection_path)
+        items = dict(
+            items,
+            **{posixpath.join(collection_dir, name): page for name, page in pages.items()},
+        )
+    files = {fs._strip_protocol(path): obj for path, obj in items.items()}
+    files_manifest = {}
+    hashes = {}
+    removed = []
+    if l_incremental:
+        old = read_static_manifest(fs, manifest_path)
+        fmt = dict(indent=indent, gzip=l_gzip)
+        files_manifest = old["files"] if old.get("format") == fmt else {}
+        hashes = {path: get_content_hash(obj) for path, obj in files.items()}
+        hashes[collection_fs_path] = get_content_hash(collection)
+        removed = [path for path in old["files"] if path not in hashes]
+        files = {
+            path: obj for path, obj in files.items() if files_manifest.get(path) != hashes[path]
+        }
+    batch = []
+    batches = []
+    directories = {posixpath.dirname(collection_fs_path)}
+    for fs_path, obj in files.items():
+        directories.add(posixpath.dirname(fs_path))
+        batch.append((fs_path, obj))
+        if len(batch) == batch_size:
+            batches.append(batch)
+            batch = []
+    if batch:
+        batches.append(batch)
+    if not _is_object_store(fs):
+        for directory in directories:
+            if directory:
+                fs.makedirs(directory, exist_ok=True)
+    errors = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for batch_errors in pool.map(
+            lambda batch: _write_batch(fs, batch, indent, json_backend, l_gzip), batches
+        ):
+            errors.update(batch_errors)
+    if l_incremental:
+        for path in errors:
+            files_manifest.pop(path, None)
+        files_manifest.update({path: hashes[path] for path in files if path not in errors})
+    if errors:
+        if l_incremental:
+            write_json_atomic(fs, manifest_path, dict(format=fmt, files=files_manifest))
+        raise ValueError(
+            f"Could not write {len(errors)} of {len(files)} files, "
+            f"{collection_path} was not published: {errors}"
+        )
+    if not l_incremental or files_manifest.get(collection_fs_path) != hashes[collection_fs_path]:
+        write_json_atomic(
+            fs,
+            collection_fs_path,
+            collection,
+            indent=indent,
+            json_backend=json_backend,
+            l_gzip=l_gzip,
+        )
+    if l_incremental:
+        _remove_files(fs, removed, old.get("format", {}).get("gzip", False))
+        for path in removed:
+            files_manifest.pop(path, None)
+        files_manifest[collection_fs_path] = hashes[collection_fs_path]
+        write_json_atomic(fs, manifest_path, dict(format=fmt, files=files_manifest))
+    return len([path for path in files if path in item_paths])
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+SAMPLE_SIZE = 1000
+GAP_CHUNK_SIZE = 2**20
+MAX_REPORTED_GAPS = 10
+# step in seconds to the frequency names used in frequency_mapping
+FIXED_FREQUENCIES = {
+    600: "10m",
+    900: "15m",
+    1800: "30m",
+    3600: "1hr",
+    3 * 3600: "3hr",
+    4 * 3600: "4hr",
+    6 * 3600: "6hr",
+    86400: "daily",
+}
+DAY = 86400
+
+
+def _to_seconds(index: pd.Index) -> np.ndarray:
+    """Time values as int64 seconds. Works for DatetimeIndex and CFTimeIndex."""
+    if hasattr(index, "asi8"):
+        factor = 10**9 if isinstance(index, pd.DatetimeIndex) else 10**6
+        if isinstance(index, pd.DatetimeIndex) and index.unit != "ns":
+            factor = {"s": 1, "ms": 10**3, "us": 10**6}[index.unit]
+        return index.asi8 // factor
+    values = np.asarray(index.values)
+    return values.astype("datetime64[s]").astype("int64")
+
+
+def _to_months(index: pd.Index) -> np.ndarray:
+    if isinstance(index, pd.DatetimeIndex):
+        return index.year.to_numpy() * 12 + index.month.to_numpy()
+    return np.array([value.year * 12 + value.month for value in index])
+
+
+def get_frequency_name(step: int) -> str:
+    if step in FIXED_FREQUENCIES:
+        return FIXED_FREQUENCIES[step]
+    if step % DAY == 0:
+        return f"{step // DAY}day"
+    if step % 3600 == 0:
+        return f"{step // 3600}hr"
+    if step % 60 == 0:
+        return f"{step // 60}m"
+    return f"{step}s"
+
+
+def infer_frequency(index: pd.Index, sample_size: int = SAMPLE_SIZE) -> dict:
+    """Infer the frequency from the median diff of the first sample_size
+    time values. Returns dict(frequency, step) with step in seconds, or
+    None for calendar based frequencies, or an empty dict if there are
+    less than two time values. NaT values are ignored."""
+    index = index.dropna()
+    if len(index) < 2:
+        return dict()
+    sample = _to_seconds(index[:sample_size])
+    diffs = np.diff(sample)
+    diffs = diffs[diffs > 0]
+    if not len(diffs):
+        return dict()
+    step = int(np.median(diffs))
+    if 28 * DAY <= step <= 31 * DAY:
+        return dict(frequency="monthly", step=None)
+    if 365 * DAY <= step <= 366 * DAY:
+        return dict(frequency="yearly", step=None)
+    return dict(frequency=get_frequency_name(step), step=step)
+
+
+def find_time_gaps(
+    index: pd.Index,
+    step: int = None,
+    frequency: str = None,
+    chunk_size: int = GAP_CHUNK_SIZE,
+    max_gaps: int = MAX_REPORTED_GAPS,
+) -> dict:
+    """Count missing timesteps in chunks of chunk_size values.
+
+    For a fixed step in seconds, a diff of n steps means n-1 missing values.
+    For monthly and yearly frequencies, month ordinals are compared instead.
+    Returns dict(missing_steps, gaps) with the first max_gaps gaps as
+    [last value before, first value after]. NaT values are dropped first,
+    so they count as missing steps.
+    """
+    index = index.dropna()
+    if frequency in ["monthly", "yearly"]:
+        values = _to_months(index)
+        step = 1 if frequency == "monthly" else 12
+    elif step:
+        values = _to_seconds(index)
+    else:
+        return dict(missing_steps=0, gaps=[])
+    missing = 0
+    gaps = []
+    for start in range(0, max(len(values) - 1, 0), chunk_size):
+        # the chunks overlap by one value so no diff is lost
+        diffs = np.diff(values[start : start + chunk_size + 1])
+        gap_positions = np.nonzero(diffs > step)[0]
+        if not len(gap_positions):
+            continue
+        missing += int(np.sum(np.rint(diffs[gap_positions] / step).astype("int64") - 1))
+        for pos in gap_positions[: max(max_gaps - len(gaps), 0)]:
+            gaps.append([index[start + pos], index[start + pos + 1]])
+    return dict(missing_steps=missing, gaps=gaps)
+
+
+def get_time_axis_summary(index: pd.Index) -> dict:
+    """Frequency, step in seconds, missing steps and first gaps of a time index."""
+    summary = infer_frequency(index)
+    if not summary:
+        return summary
+    summary.update(find_time_gaps(index, summary["step"], summary["frequency"]))
+    return summary
@@ -0,0 +1,494 @@
+import hashlib
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import fsspec
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+ZARR_V2_METADATA = ".zmetadata"
+ZARR_V3_METADATA = "zarr.json"
+# attributes that xarray moves from attrs into encoding when decoding
+CF_ENCODING_ATTRS = [
+    "_ARRAY_DIMENSIONS",
+    "_FillValue",
+    "missing_value",
+    "scale_factor",
+    "add_offset",
+    "dtype",
+    "_Unsigned",
+    "coordinates",
+]
+TIME_ENCODING_ATTRS = ["units", "calendar"]
+# coordinates larger than this are only read at their endpoints or skipped
+SMALL_COORD_SIZE = 2**20
+DEFAULT_COORDS = ["time", "lat", "lon"]
+METADATA_KEYS = [".zarray", ".zattrs", ".zgroup", ".zmetadata", "zarr.json"]
+LISTING_WORKERS = 16
+# zarr v3 data types of variable length
+V3_OBJECT_DTYPES = ["string", "variable_length_utf8", "bytes", "variable_length_bytes"]
+
+
+def get_mapper(href: str, storage_options: dict = None):
+    return fsspec.get_mapper(href, **(storage_options or {}))
+
+
+def _parse_v2(zmetadata: dict) -> dict:
+    metadata = zmetadata["metadata"]
+    arrays = {}
+    for key, zarray in metadata.items():
+        if not key.endswith("/.zarray"):
+            continue
+        name = key[: -len("/.zarray")]
+        attrs = dict(metadata.get(f"{name}/.zattrs", {}))
+        dims = attrs.get("_ARRAY_DIMENSIONS", [f"dim_{i}" for i in range(len(zarray["shape"]))])
+        arrays[name] = dict(
+            shape=list(zarray["shape"]),
+            dtype=zarray["dtype"],
+            dims=list(dims),
+            attrs=attrs,
+            zarr_format=2,
+            zarr_metadata=zarray,
+        )
+    return dict(zarr_format=2, attrs=dict(metadata.get(".zattrs", {})), arrays=arrays)
+
+
+def _parse_v3(zarr_json: dict) -> dict:
+    consolidated = zarr_json.get("consolidated_metadata")
+    if not consolidated:
+        raise ValueError("No consolidated metadata found in zarr.json")
+    arrays = {}
+    for name, meta in consolidated["metadata"].items():
+        if meta.get("node_type") != "array":
+            continue
+        arrays[name] = dict(
+            shape=list(meta["shape"]),
+            dtype=meta["data_type"],
+            dims=list(meta.get("dimension_names") or [f"dim_{i}" for i in range(len(meta["shape"]))]),
+            attrs=dict(meta.get("attributes", {})),
+            zarr_format=3,
+            zarr_metadata=meta,
+        )
+    return dict(zarr_format=3, attrs=dict(zarr_json.get("attributes", {})), arrays=arrays)
+
+
+def read_consolidated_metadata(href: str, storage_options: dict = None, mapper=None) -> dict:
+    """Read and normalize consolidated metadata of a Zarr v2 or v3 store.
+
+    Returns dict(zarr_format, attrs, arrays) where arrays maps each array
+    name to dict(shape, dtype, dims, attrs, zarr_format, zarr_metadata).
+    """
+    if mapper is None:
+        mapper = get_mapper(href, storage_options)
+    raw = mapper.get(ZARR_V3_METADATA)
+    if raw is not None:
+        zarr_json = json.loads(raw)
+        if zarr_json.get("zarr_format") == 3:
+            return _parse_v3(zarr_json)
+    raw = mapper.get(ZARR_V2_METADATA)
+    if raw is None:
+        raise ValueError(f"No consolidated metadata found for {href}")
+    return _parse_v2(json.loads(raw))
+
+
+def get_numpy_dtype(dtype) -> np.dtype:
+    """numpy dtype of a zarr v2 dtype or a zarr v3 data_type name or dict.
+
+    Fixed length strings and bytes keep their length, variable length ones
+    and unknown extension data types become object.
+    """
+    if isinstance(dtype, dict):
+        name = dtype.get("name")
+        config = dtype.get("configuration") or {}
+        if name == "fixed_length_utf32":
+            return np.dtype(f"<U{config['length_bytes'] // 4}")
+        if name in ["null_terminated_bytes", "fixed_length_bytes"]:
+            return np.dtype(f"S{config['length_bytes']}")
+        if name == "raw_bytes":
+            return np.dtype(f"V{config['length_bytes']}")
+        if name in ["numpy.datetime64", "numpy.timedelta64"]:
+            kind = "M8" if name == "numpy.datetime64" else "m8"
+            return np.dtype(f"{kind}[{config.get('scale_factor', 1)}{config['unit']}]")
+        dtype = name
+    if dtype in V3_OBJECT_DTYPES:
+        return np.dtype(object)
+    if isinstance(dtype, str) and dtype.startswith("r") and dtype[1:].isdigit():
+        return np.dtype(f"V{int(dtype[1:]) // 8}")
+    try:
+        return np.dtype(dtype)
+    except (TypeError, ValueError):
+        return np.dtype(object)
+
+
+class ZarrMetadataVariable:
+    """Metadata of one zarr array, providing the parts of xarray.Variable
+    that the item builders need without reading any data."""
+
+    def __init__(self, name: str, array_meta: dict):
+        self.name = name
+        self.dims = tuple(array_meta["dims"])
+        self.shape = tuple(array_meta["shape"])
+        self.attrs = {}
+        self.encoding = dict(zarr_format=array_meta["zarr_format"], zarr_metadata=array_meta["zarr_metadata"])
+        raw_attrs = array_meta["attrs"]
+        is_time = " since " in str(raw_attrs.get("units", ""))
+        for key, value in raw_attrs.items():
+            if key in CF_ENCODING_ATTRS or (is_time and key in TIME_ENCODING_ATTRS):
+                self.encoding[key] = value
+            else:
+                self.attrs[key] = value
+        self.encoding["dtype"] = get_numpy_dtype(array_meta["dtype"])
+        self.dtype = self.encoding["dtype"]
+        if is_time:
+            self.dtype = np.dtype("datetime64[ns]")
+        elif "scale_factor" in raw_attrs or "add_offset" in raw_attrs:
+            self.dtype = np.dtype("float64")
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    @property
+    def size(self) -> int:
+        return math.prod(self.shape)
+
+    @property
+    def nbytes(self) -> int:
+        return self.size * self.dtype.itemsize
+
+
+class ZarrMetadataDataset:
+    """Dataset view on consolidated zarr metadata.
+
+    Mimics the parts of xarray.Dataset used by the item builders. Only the
+    coordinates passed to load_coords are read from the store; variables[...]
+    is metadata only while ds[...] returns the loaded DataArray if there is one.
+    """
+
+    def __init__(self, href: str, metadata: dict, mapper=None):
+        self.href = href
+        self.mapper = mapper
+        self.zarr_format = metadata["zarr_format"]
+        self.attrs = dict(metadata["attrs"])
+        self.encoding = dict(source=href)
+        self.variables = {
+            name: ZarrMetadataVariable(name, array_meta)
+            for name, array_meta in metadata["arrays"].items()
+        }
+        coord_names = set(self.sizes)
+        coord_names.update(str(self.attrs.pop("coordinates", "")).split())
+        for var in self.variables.values():
+            coord_names.update(str(var.encoding.get("coordinates", "")).split())
+        self.coords = {name: var for name, var in self.variables.items() if name in coord_names}
+        self.data_vars = {name: var for name, var in self.variables.items() if name not in coord_names}
+        # same order as xarray: data variables first, then coordinates
+        self.variables = {**self.data_vars, **self.coords}
+        self._loaded = {}
+        self._indexes = {}
+
+    @property
+    def sizes(self) -> dict:
+        sizes = {}
+        for var in self.variables.values():
+            sizes.update(zip(var.dims, var.shape))
+        return sizes
+
+    dims = sizes
+
+    @property
+    def nbytes(self) -> int:
+        return sum(var.nbytes for var in self.variables.values())
+
+    @property
+    def indexes(self) -> dict:
+        return self._indexes
+
+    def __contains__(self, name) -> bool:
+        return name in self.variables
+
+    def __iter__(self):
+        return iter(self.data_vars)
+
+    def __getitem__(self, name):
+        if name in self._loaded:
+            return self._loaded[name]
+        return self.variables[name]
+
+    def _get_zarr_store(self):
+        store = self.mapper
+        try:
+            from zarr.storage import FsspecStore
+        except ImportError:
+            # zarr<3 takes the mapper as it is
+            return store
+        return FsspecStore.from_mapper(store, read_only=True)
+
+    def _read_values(self, name: str, l_endpoints: bool) -> np.ndarray:
+        import zarr
+
+        array = zarr.open_array(self._get_zarr_store(), path=name, mode="r", zarr_format=self.zarr_format)
+        if l_endpoints:
+            return np.array([array[0], array[-1]])
+        return array[...]
+
+    def load_coords(self, names: list = None, max_size: int = SMALL_COORD_SIZE) -> "ZarrMetadataDataset":
+        """Read and decode small coordinates.
+
+        1-D dimension coordinates above max_size are read at their endpoints
+        only, other coordinates above max_size are skipped.
+        """
+        if names is None:
+            names = DEFAULT_COORDS
+        for name in names:
+            var = self.variables.get(name)
+            if var is None or name in self._loaded or var.size == 0:
+                continue
+            l_index = var.dims == (name,)
+            l_endpoints = var.size > max_size
+            if l_endpoints and not l_index:
+                continue
+            values = self._read_values(name, l_endpoints)
+            attrs = {
+                key: value for key, value in var.encoding.items()
+                if key in TIME_ENCODING_ATTRS + ["scale_factor", "add_offset"]
+            }
+            attrs.update(var.attrs)
+            decoded = xr.decode_cf(xr.Dataset({name: (var.dims, values, attrs)}))[name]
+            self._loaded[name] = decoded
+            if l_index and not l_endpoints:
+                self._indexes[name] = pd.Index(decoded.values, name=name)
+        return self
+
+
+def open_zarr_metadata(
+    href: str,
+    storage_options: dict = None,
+    coords: list = None,
+    max_coord_size: int = SMALL_COORD_SIZE,
+) -> ZarrMetadataDataset:
+    """Open a zarr store by its consolidated metadata only, reading just the
+    coordinates named in coords (time, lat, lon and the dimension
+    coordinates by default)."""
+    mapper = get_mapper(href, storage_options)
+    metadata = read_consolidated_metadata(href, mapper=mapper)
+    ds = ZarrMetadataDataset(href, metadata, mapper=mapper)
+    if coords is None:
+        # dimension coordinates give the datacube dimension extents
+        coords = DEFAULT_COORDS + [name for name, var in ds.coords.items() if var.dims == (name,)]
+    return ds.load_coords(coords, max_coord_size)
+
+
+def get_signature(ds) -> str:
+    """Hash of the variable names, dims, shapes and encoded dtypes of an
+    xarray Dataset or ZarrMetadataDataset. Chunks, codecs and attrs are
+    ignored, so differently chunked copies of the same data match."""
+    content = sorted(
+        [
+            name,
+            list(var.dims),
+            [int(size) for size in var.shape],
+            get_numpy_dtype(var.encoding.get("dtype", var.dtype)).str,
+        ]
+        for name, var in ds.variables.items()
+    )
+    return hashlib.sha256(json.dumps(content).encode()).hexdigest()
+
+
+def get_codec_config(codec) -> dict:
+    """Normalize a numcodecs/zarr codec object or metadata dict to
+    dict(name, configuration) as in zarr v3 metadata."""
+    if hasattr(codec, "to_dict"):
+        codec = codec.to_dict()
+    elif hasattr(codec, "get_config"):
+        codec = codec.get_config()
+    codec = dict(codec)
+    if "name" in codec:
+        return dict(name=codec["name"], configuration=dict(codec.get("configuration") or {}))
+    name = codec.pop("id", "unknown")
+    return dict(name=name, configuration=codec)
+
+
+def _get_layout_from_metadata(array_meta: dict, zarr_format: int) -> dict:
+    if zarr_format == 2:
+        codecs = list(array_meta.get("filters") or [])
+        if array_meta.get("compressor"):
+            codecs.append(array_meta["compressor"])
+        return dict(chunks=list(array_meta["chunks"]), shards=None, codecs=codecs)
+    chunks = list(array_meta["chunk_grid"]["configuration"]["chunk_shape"])
+    codecs = list(array_meta.get("codecs") or [])
+    shards = None
+    if codecs and get_codec_config(codecs[0])["name"] == "sharding_indexed":
+        sharding = get_codec_config(codecs[0])["configuration"]
+        shards = chunks
+        chunks = list(sharding["chunk_shape"])
+        codecs = list(sharding.get("codecs") or [])
+    return dict(chunks=chunks, shards=shards, codecs=codecs)
+
+
+def get_chunk_layout(var) -> dict:
+    """Chunk shape, shard shape, codec pipeline and uncompressed chunk size
+    of a variable from its encoding.
+
+    Works for variables of datasets opened by xarray from zarr and for
+    ZarrMetadataVariable. Returns an empty dict if there is no zarr encoding.
+    """
+    encoding = var.encoding
+    if "zarr_metadata" in encoding:
+        layout = _get_layout_from_metadata(encoding["zarr_metadata"], encoding["zarr_format"])
+    elif encoding.get("chunks"):
+        codecs = list(encoding.get("filters") or [])
+        if encoding.get("serializer"):
+            codecs.append(encoding["serializer"])
+        if encoding.get("compressors"):
+            codecs.extend(encoding["compressors"])
+        elif encoding.get("compressor"):
+            codecs.append(encoding["compressor"])
+        shards = encoding.get("shards")
+        layout = dict(
+            chunks=list(encoding["chunks"]),
+            shards=list(shards) if shards else None,
+            codecs=codecs,
+        )
+    else:
+        return {}
+    layout["codecs"] = [get_codec_config(codec) for codec in layout["codecs"]]
+    itemsize = get_numpy_dtype(encoding.get("dtype", var.dtype)).itemsize
+    layout["chunk_bytes"] = math.prod(layout["chunks"]) * itemsize
+    return layout
+
+
+def get_first_chunk_key(name: str, array_meta: dict, zarr_format: int) -> str:
+    """Store key of the first chunk (or shard) of an array."""
+    ndim = len(array_meta["shape"])
+    if zarr_format == 2:
+        separator = array_meta.get("dimension_separator") or "."
+        return f"{name}/" + separator.join(["0"] * max(ndim, 1))
+    encoding = array_meta.get("chunk_key_encoding", {"name": "default"})
+    separator = encoding.get("configuration", {}).get("separator")
+    if encoding["name"] == "v2":
+        return f"{name}/" + (separator or ".").join(["0"] * max(ndim, 1))
+    return f"{name}/" + (separator or "/").join(["c"] + ["0"] * ndim)
+
+
+def probe_compressed_chunk_bytes(mapper, metadata: dict, names: list = None) -> dict:
+    """Estimate the compressed size of one chunk per array from the stored
+    size of its first chunk, or of its first shard divided by the chunks
+    per shard. Arrays whose first chunk is missing are left out."""
+    arrays = metadata["arrays"]
+    if names is None:
+        names = list(arrays)
+    keys = {
+        name: get_first_chunk_key(name, arrays[name]["zarr_metadata"], arrays[name]["zarr_format"])
+        for name in names
+        if name in arrays
+    }
+    fs = mapper.fs
+    paths = {name: mapper._key_to_str(key) for name, key in keys.items()}
+    try:
+        sizes = dict(zip(paths, fs.sizes(list(paths.values()))))
+    except (FileNotFoundError, OSError, ValueError):
+        sizes = {}
+        for name, path in paths.items():
+            try:
+                sizes[name] = fs.size(path)
+            except (FileNotFoundError, OSError, ValueError):
+                continue
+    estimates = {}
+    for name, size in sizes.items():
+        if size is None:
+            continue
+        layout = _get_layout_from_metadata(arrays[name]["zarr_metadata"], arrays[name]["zarr_format"])
+        chunks_per_shard = 1
+        if layout["shards"]:
+            chunks_per_shard = math.prod(
+                math.ceil(s / c) for s, c in zip(layout["shards"], layout["chunks"])
+            )
+        estimates[name] = int(size / chunks_per_shard)
+    return estimates
+
+
+def _is_metadata_key(key: str) -> bool:
+    return key.rsplit("/", 1)[-1] in METADATA_KEYS
+
+
+def _sum_sizes(sizes) -> dict:
+    sizes = list(sizes)
+    return dict(bytes=int(sum(sizes)), chunks=len(sizes))
+
+
+def _get_listed_sizes(fs, root: str, name: str) -> dict:
+    try:
+        listing = fs.find(f"{root}/{name}", detail=True)
+    except FileNotFoundError:
+        return _sum_sizes([])
+    return _sum_sizes(
+        info.get("size") or 0 for path, info in listing.items() if not _is_metadata_key(path)
+    )
+
+
+def _get_parquet_reference_sizes(fs, root: str, name: str) -> dict:
+    files = fs.glob(f"{root}/{name}/refs.*.parq")
+    if not files:
+        return _sum_sizes([])
+    refs = pd.concat(
+        [pd.read_parquet(fs.open(fn), columns=["path", "size", "raw"]) for fn in files]
+    )
+    linked = refs["path"].notna()
+    inlined = refs["raw"].notna() & ~linked
+    nbytes = refs.loc[linked, "size"].sum() + refs.loc[inlined, "raw"].str.len().sum()
+    return dict(bytes=int(nbytes), chunks=int(linked.sum() + inlined.sum()))
+
+
+def _get_json_reference_sizes(references: dict, names: list) -> dict:
+    sizes = {name: [] for name in names}
+    for key, ref in references.items():
+        name = key.rsplit("/", 1)[0]
+        if name not in sizes or _is_metadata_key(key):
+            continue
+        if isinstance(ref, (list, tuple)):
+            # [url] references whole files of unknown size
+            sizes[name].append(ref[2] if len(ref) == 3 else 0)
+        else:
+            sizes[name].append(len(ref))
+    return {name: _sum_sizes(var_sizes) for name, var_sizes in sizes.items()}
+
+
+@lru_cache(maxsize=256)
+def _get_stored_sizes(href: str, storage_options_json: str, names: tuple, max_workers: int) -> dict:
+    storage_options = json.loads(storage_options_json)
+    if href.startswith("reference::"):
+        target = href.split("::", 1)[1]
+        fs, root = fsspec.core.url_to_fs(target, **storage_options.get("target_options", {}))
+        if fs.isdir(root):
+            with ThreadPoolExecutor(max_workers) as pool:
+                sizes = pool.map(lambda name: _get_parquet_reference_sizes(fs, root, name), names)
+            return dict(zip(names, sizes))
+        with fs.open(root) as f:
+            references = json.load(f)
+        return _get_json_reference_sizes(references.get("refs", references), names)
+    fs, root = fsspec.core.url_to_fs(href, **storage_options)
+    root = root.rstrip("/")
+    with ThreadPoolExecutor(max_workers) as pool:
+        sizes = pool.map(lambda name: _get_listed_sizes(fs, root, name), names)
+    return dict(zip(names, sizes))
+
+
+def get_stored_sizes(
+    href: str,
+    names: list,
+    storage_options: dict = None,
+    max_workers: int = LISTING_WORKERS,
+) -> dict:
+    """Stored (compressed) bytes and number of stored chunk objects per array.
+
+    Native stores are listed concurrently per array. For kerchunk stores
+    (reference::) the sizes come from the size columns of parquet references
+    or the [url, offset, size] entries of json references. For sharded
+    stores, chunks counts shards. Results are cached per href.
+    """
+    storage_options_json = json.dumps(storage_options or {}, sort_keys=True, default=str)
+    sizes = _get_stored_sizes(href, storage_options_json, tuple(names), max_workers)
+    return {name: dict(size) for name, size in sizes.items()}
@@ -1,11 +1,35 @@
 import xarray as xr
-from pystac import Item, Asset, MediaType
+from pystac import Item, Asset, MediaType, get_stac_version
+from pystac.utils import datetime_to_str
 from datetime import datetime
 from copy import deepcopy as copy
+from concurrent.futures import ThreadPoolExecutor
 import fsspec
 import math
+import re
 import json
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+import numpy as np
+import pandas as pd
 from .utils.defaults import *
+from .utils.serialize import make_json_serializable, dumps
+from .utils.attrs import split_oversized_attrs
+from .utils.time_axis import get_time_axis_summary, infer_frequency
+from .utils.grids import get_grid_key, get_grid_ncells, GridRegistry, DEFAULT_GRID_REGISTRY
+from .utils.zarr_metadata import (
+    open_zarr_metadata,
+    get_chunk_layout,
+    get_mapper,
+    read_consolidated_metadata,
+    probe_compressed_chunk_bytes,
+    get_stored_sizes,
+    get_numpy_dtype,
+    get_signature,
+    ZarrMetadataDataset,
+    SMALL_COORD_SIZE,
+    LISTING_WORKERS
+)
 
 HOSTURL="https://stac2.cloud.dkrz.de/fastapi"
 HOSTURL="https://2catalogs-bcb301.gitlab-pages.dkrz.de/catalog/"
@@ -42,6 +66,16 @@ DKRZ_IMPRINT_POLICY = """
 [Privacy Policy](https://www.dkrz.de/en/about-en/contact/en-datenschutzhinweise).
 """
 
+# byte limits for global attributes in item properties, None means no limit.
+# Attributes above the limits go to a json sidecar in sidecar_target which
+# is linked from the item with sidecar_href (defaults to sidecar_target).
+ATTRS_POLICY=dict(
+    max_attr_bytes=None,
+    max_attrs_bytes=None,
+    sidecar_target=None,
+    sidecar_href=None
+)
+
 NEEDED_ATTRS=[
     'title',
     'description',
@@ -81,6 +115,15 @@ PROJECT_KEYS=[
         "activity"
         ]
 
+SPATIAL_DIMENSIONS={
+    "x":["lon","longitude","x","rlon","grid_longitude","projection_x_coordinate"],
+    "y":["lat","latitude","y","rlat","grid_latitude","projection_y_coordinate"],
+    "z":["lev","level","plev","height","depth","altitude","z","alt","air_pressure"]
+}
+
+# zoom levels probed for HEALPix pyramids
+MAX_HEALPIX_ZOOM=12
+
 frequency_mapping = {
     "10m": "10m",
     "15m": "15m",
@@ -99,12 +142,48 @@ frequency_mapping = {
     "grid": "fx"
 }
 
+@dataclass(frozen=True)
+class StacItemConfig:
+    """Settings of one item generation call.
+
+    Immutable, so threads can share one or use their own with e.g. another
+    hosturl. Defaults are the module globals at creation time. The mappings
+    are read-only views. Without grid_registry, the module wide
+    DEFAULT_GRID_REGISTRY is used.
+    """
+    hosturl:str=field(default_factory=lambda: HOSTURL)
+    l_api:bool=field(default_factory=lambda: L_API)
+    id_template:str=field(default_factory=lambda: ID_TEMPLATE)
+    gridlook:str=field(default_factory=lambda: GRIDLOOK)
+    jupyterlite:str=field(default_factory=lambda: JUPYTERLITE)
+    hosturls:MappingProxyType=field(default_factory=lambda: HOSTURLS)
+    frequency_mapping:MappingProxyType=field(default_factory=lambda: frequency_mapping)
+    grid_registry:GridRegistry=None
+
+    def __post_init__(self):
+        for name in ["hosturls","frequency_mapping"]:
+            value=getattr(self,name)
+            if not isinstance(value,MappingProxyType):
+                object.__setattr__(self,name,MappingProxyType(dict(value or {})))
+
+def get_item_config(config:StacItemConfig=None,**overrides)->StacItemConfig:
+    """config, or one from the current module globals, with overrides applied."""
+    if config is None:
+        config=StacItemConfig()
+    if overrides:
+        config=replace(config,**overrides)
+    return config
+
 # Function to determine frequency
-def set_frequency(inp:str, ds):
-    global frequency_mapping
+def set_frequency(inp:str, ds, config:StacItemConfig=None):
+    frequency_mapping=get_item_config(config).frequency_mapping
+    if not ds.attrs.get("frequency") and "time" in ds.indexes:
+        ds.attrs["frequency"] = infer_frequency(ds.indexes["time"]).get("frequency")
     if not ds.attrs.get("frequency"):
+        # whole tokens only, substrings like "1m" match too many names
+        tokens=set(re.split(r"[^a-z0-9]+",inp.lower()))
         for keyword, frequency in frequency_mapping.items():
-            if keyword in inp.lower():
+            if keyword in tokens:
                 ds.attrs["frequency"] = frequency
                 break
     if not ds.attrs.get("frequency"):
@@ -129,35 +208,165 @@ def get_bbox(
     latmax:float=90.
 ) -> list:
     if all(a in ds.variables for a in ["lon","lat"]):
-        ds=ds.reset_coords()[["lon","lat"]]
         try:
-            lonmin=ds["lon"].min().values[()]
-            latmin=ds["lat"].min().values[()]
-            lonmax=ds["lon"].max().values[()]
-            latmax=ds["lat"].max().values[()]
+            lonmin,lonmax=get_min_max(ds,"lon")
+            latmin,latmax=get_min_max(ds,"lat")
         except:
             pass
     
     return [lonmin, latmin, lonmax, latmax]
 
-def get_cube_extension(ds:xr.Dataset,time_min: str, time_max: str)->dict:
+def get_grid_registry(config:StacItemConfig=None) -> GridRegistry:
+    return get_item_config(config).grid_registry or DEFAULT_GRID_REGISTRY
+
+def get_grid_info(ds:xr.Dataset,config:StacItemConfig=None) -> dict:
+    """bbox and ncells of the grid of ds. For grids with an id attribute,
+    they are computed once and then taken from the grid registry."""
+    key=get_grid_key(ds)
+    if not key:
+        return dict(bbox=get_bbox(ds),ncells=get_grid_ncells(ds))
+    registry=get_grid_registry(config)
+    info=registry.get(key)
+    if info.get("bbox") is None:
+        info=registry.update(key,bbox=[float(value) for value in get_bbox(ds)],ncells=get_grid_ncells(ds))
+    return dict(info,id=key)
+
+def get_cube_extension(
+    ds:xr.Dataset,
+    time_min: str,
+    time_max: str,
+    l_chunklayout:bool=True,
+    compressed_chunk_bytes:dict=None,
+    stored_sizes:dict=None
+)->dict:
     cube=dict()
     cube['cube:dimensions']=dict()
     cube['cube:variables']=dict()
+    compressed_chunk_bytes=compressed_chunk_bytes or dict()
     for dv in ds.data_vars:
+        # ds.variables avoids constructing a DataArray per variable
+        var=ds.variables[dv]
         cube['cube:variables'][dv]=dict(
                 type="data",
-                dimensions=[*ds[dv].dims],
-                unit=ds[dv].attrs.get("units","Not set"),
-                description=ds[dv].attrs.get("long_name",dv),
-                #attrs=ds[dv].attrs
+                dimensions=[*var.dims],
+                unit=var.attrs.get("units","Not set"),
+                description=var.attrs.get("long_name",dv),
+                #attrs=var.attrs
         )
-    if time_min and time_max:
-        cube['cube:dimensions']["time"]=dict(
+        if l_chunklayout:
+            cube['cube:variables'][dv].update(get_cube_chunk_fields(var,compressed_chunk_bytes.get(dv)))
+        if stored_sizes and dv in stored_sizes:
+            cube['cube:variables'][dv]["zarr:stored_bytes"]=stored_sizes[dv]["bytes"]
+            cube['cube:variables'][dv]["zarr:stored_chunks"]=stored_sizes[dv]["chunks"]
+    cube['cube:dimensions']=get_cube_dimensions(ds,time_min,time_max)
+    return cube
+
+def get_dimension_axis(name:str,attrs:dict)->str:
+    axis=str(attrs.get("axis","")).lower()
+    if axis in ["x","y","z"]:
+        return axis
+    if attrs.get("positive") in ["up","down"]:
+        return "z"
+    lower_name=name.lower()
+    standard_name=str(attrs.get("standard_name","")).lower()
+    for axis,names in SPATIAL_DIMENSIONS.items():
+        if lower_name in names or standard_name in names:
+            return axis
+    return None
+
+def get_index_step(values:np.ndarray):
+    """Step between equally spaced values or None, checked on all diffs at once."""
+    if len(values) < 2:
+        return None
+    diffs=np.diff(values)
+    if diffs.dtype.kind == "f":
+        l_equal=np.allclose(diffs,diffs[0],rtol=1e-6,atol=0)
+    else:
+        l_equal=bool(np.all(diffs == diffs[0]))
+    return diffs[0] if l_equal else None
+
+def _to_time_str(value)->str:
+    return str(value).split('.')[0].replace(' ','T')+'Z'
+
+def get_cube_dimensions(ds:xr.Dataset,time_min:str=None,time_max:str=None)->dict:
+    """Datacube dimensions with extent, step and size from the in-memory
+    indexes or loaded coordinate endpoints. No data variable is read."""
+    dimensions=dict()
+    indexes=ds.indexes
+    for dim,size in ds.sizes.items():
+        coord=ds.variables.get(dim)
+        attrs=coord.attrs if coord is not None else dict()
+        values=None
+        l_complete=False
+        if dim in indexes:
+            values=np.asarray(indexes[dim].values)
+            l_complete=True
+        elif coord is not None and isinstance(ds,ZarrMetadataDataset) and isinstance(ds[dim],xr.DataArray):
+            # endpoints of a large coordinate read by load_coords
+            values=np.asarray(ds[dim].values)
+        if values is None or len(values) == 0:
+            if dim == "time" and time_min and time_max:
+                dimensions[dim]=dict(type="temporal",extent=[time_min,time_max],size=size)
+            else:
+                dimensions[dim]=dict(type="other",extent=[0,size-1],step=1,size=size)
+            continue
+        if values.dtype.kind == "M" or (values.dtype.kind == "O" and hasattr(values[0],"calendar")):
+            step=get_index_step(values) if l_complete else None
+            extent=[_to_time_str(min(values[0],values[-1])),_to_time_str(max(values[0],values[-1]))]
+            if dim == "time" and time_min and time_max:
+                extent=[time_min,time_max]
+            dimensions[dim]=dict(
                 type="temporal",
-                extent=[time_min, time_max]
+                extent=extent,
+                step=pd.Timedelta(step).isoformat() if step is not None else None,
+                size=size
+            )
+            continue
+        if values.dtype.kind not in "iuf":
+            dimensions[dim]=dict(type="other",values=values.tolist(),size=size)
+            continue
+        step=get_index_step(values) if l_complete else None
+        dimension=dict(
+            type="other",
+            extent=[values.min(),values.max()],
+            step=step,
+            size=size
         )
-    return cube
+        axis=get_dimension_axis(dim,attrs)
+        if axis:
+            dimension["type"]="spatial"
+            dimension["axis"]=axis
+        if attrs.get("units"):
+            dimension["unit"]=attrs["units"]
+        dimensions[dim]=dimension
+    return dimensions
+
+def get_cube_chunk_fields(var,compressed_chunk_bytes:int=None)->dict:
+    layout=get_chunk_layout(var)
+    if not layout:
+        return dict()
+    fields={
+        "zarr:chunk_shape":layout["chunks"],
+        "zarr:codecs":layout["codecs"],
+        "zarr:chunk_bytes":layout["chunk_bytes"]
+    }
+    if layout["shards"]:
+        fields["zarr:shard_shape"]=layout["shards"]
+    if compressed_chunk_bytes:
+        fields["zarr:compressed_chunk_bytes"]=compressed_chunk_bytes
+    return fields
+
+def get_compressed_chunk_bytes(ds:xr.Dataset,href:str)->dict:
+    if isinstance(ds,ZarrMetadataDataset):
+        mapper=ds.mapper
+        metadata=dict(arrays={
+            name:dict(shape=var.shape,zarr_format=var.encoding["zarr_format"],zarr_metadata=var.encoding["zarr_metadata"])
+            for name,var in ds.data_vars.items()
+        })
+    else:
+        mapper=get_mapper(href,ds.attrs.get("open_storage_options"))
+        metadata=read_consolidated_metadata(href,mapper=mapper)
+    return probe_compressed_chunk_bytes(mapper,metadata,list(ds.data_vars))
 
 def get_from_attrs(needed_attrs:list, ds:xr.Dataset) -> dict:
     datetimeattr=datetime.now()#.isoformat()
@@ -187,14 +396,45 @@ def get_geometry(
         ]]
     }
 
+def get_min_max(ds:xr.Dataset,name:str) -> tuple:
+    """Min and max of a coordinate, from its in-memory index if it has one."""
+    if name in ds.indexes:
+        values=np.asarray(ds.indexes[name].values)
+        if values.dtype.kind in "mM":
+            values=values[~np.isnat(values)]
+        if values.dtype.kind == "f":
+            return np.nanmin(values),np.nanmax(values)
+        return values.min(),values.max()
+    return ds[name].min().values[()],ds[name].max().values[()]
+
 def get_time_min_max(ds:xr.Dataset) -> tuple[str, str]:
     time_min = time_max = None
     if "time" in ds.variables:
-        time_min=str(ds["time"].min().values[()]).split('.')[0]+'Z'
-        time_max=str(ds["time"].max().values[()]).split('.')[0]+'Z'
+        time_min,time_max=get_min_max(ds,"time")
+        time_min=str(time_min).split('.')[0]+'Z'
+        time_max=str(time_max).split('.')[0]+'Z'
     return time_min,time_max
         
-def get_providers(ds_attrs: dict) -> list:
+def get_time_axis_properties(ds:xr.Dataset) -> dict:
+    """Inferred frequency and missing timesteps of the in-memory time index."""
+    if "time" not in ds.indexes:
+        return {}
+    summary=get_time_axis_summary(ds.indexes["time"])
+    if not summary:
+        return {}
+    properties={
+        "time:frequency":summary["frequency"],
+        "time:missing_steps":summary["missing_steps"]
+    }
+    if summary["step"]:
+        properties["time:step"]=summary["step"]
+    if summary["gaps"]:
+        properties["time:gaps"]=[
+            [_to_time_str(before),_to_time_str(after)] for before,after in summary["gaps"]
+        ]
+    return properties
+
+def get_providers(ds_attrs: dict, config:StacItemConfig=None) -> list:
     providers=[copy(defaults["PROVIDER_DKRZ"])]
     creator_inst_id=ds_attrs.get(
         'institution_id',ds_attrs.get(
@@ -210,7 +450,7 @@ def get_providers(ds_attrs: dict) -> list:
         creator=copy(defaults["PROVIDER_DKRZ"])
         creator["name"]=creator_inst_id
         creator["description"]=creator_inst
-        creator["url"]=HOSTURLS.get(creator_inst_id,"N/A")
+        creator["url"]=get_item_config(config).hosturls.get(creator_inst_id,"N/A")
         creator["roles"]=["producer"]
         providers.append(creator)
     return providers
@@ -249,9 +489,22 @@ def refine_for_eerie(item_id:str,griddict:dict)->dict:
             griddict["dataset"]="gr025.zarr"
     return griddict
 
-def get_gridlook(itemdict:dict,uri:str,ds:xr.Dataset,l_eeriecloud:bool)->dict:
-    global L_API
-    if not L_API:
+def get_gridlook(
+    itemdict:dict,
+    uri:str,
+    ds:xr.Dataset,
+    l_eeriecloud:bool,
+    l_compact:bool=False,
+    var_overrides:dict=None,
+    config:StacItemConfig=None
+)->dict:
+    """Add gridlook levels to the item.
+
+    With l_compact, the level holds one default 'datasource' and
+    'datasources' only keeps entries of var_overrides that differ from it
+    instead of one copy of the store dict per variable.
+    """
+    if not get_item_config(config).l_api:
         item_id=itemdict["id"]
         store_dataset_dict=dict(
             store='/'.join(uri.split('/')[0:-1]),
@@ -261,34 +514,159 @@ def get_gridlook(itemdict:dict,uri:str,ds:xr.Dataset,l_eeriecloud:bool)->dict:
             store_dataset_dict=dict(
                 store=defaults["EERIE_CLOUD_URL"]+"/",
                 dataset=defaults["EERIE_CLOUD_URL"]+"/"+item_id+"/zarr"
-            )    
-        var_store_dataset_dict=dict()
-        # Add data variables as assets
-    #    for var_name, var_data in ds.data_vars.items():
-        for var_name, var_data in ds.variables.items():
-            var_store_dataset_dict[var_name]=copy(store_dataset_dict)
-
-        itemdict["default_var"]=list(var_store_dataset_dict.keys())[0]
+            )
+        var_overrides=var_overrides or dict()
+        if l_compact:
+            var_store_dataset_dict={
+                var_name:override
+                for var_name,override in var_overrides.items()
+                if override != store_dataset_dict
+            }
+        else:
+            # store_dataset_dict only holds strings so a shallow copy is enough
+            var_store_dataset_dict={
+                var_name:dict(var_overrides.get(var_name,store_dataset_dict))
+                for var_name in ds.variables
+            }
+
+        itemdict["default_var"]=next(iter(ds.variables),None)
         itemdict["name"]=itemdict["properties"]["title"]
 
-        griddict=copy(store_dataset_dict)
-        if l_eeriecloud:
-            griddict=refine_for_eerie(item_id,griddict)
-
-        if "era5" in item_id:
-            griddict["store"]="https://swift.dkrz.de/v1/dkrz_7fa6baba-db43-4d12-a295-8e3ebb1a01ed/grids/"
-            griddict["dataset"]="era5.zarr"
-
-        itemdict["levels"]=[
-                dict(
-                    name=item_id,
-                    time=copy(store_dataset_dict),
-                    grid=griddict,
-                    datasources=var_store_dataset_dict
-                    )
-                ]
+        griddict=dict(store_dataset_dict)
+        grid_key=get_grid_key(ds)
+        grid_store=get_grid_registry(config).get(grid_key).get("grid_store") if grid_key else None
+        if grid_store:
+            griddict=dict(grid_store)
+        else:
+            if l_eeriecloud:
+                griddict=refine_for_eerie(item_id,griddict)
+
+            if "era5" in item_id:
+                griddict["store"]="https://swift.dkrz.de/v1/dkrz_7fa6baba-db43-4d12-a295-8e3ebb1a01ed/grids/"
+                griddict["dataset"]="era5.zarr"
+            if grid_key and griddict != store_dataset_dict:
+                get_grid_registry(config).update(grid_key,grid_store=griddict)
+
+        level=dict(
+            name=item_id,
+            time=dict(store_dataset_dict),
+            grid=griddict,
+            datasources=var_store_dataset_dict
+        )
+        if l_compact:
+            level["datasource"]=dict(store_dataset_dict)
+        itemdict["levels"]=[level]
     return itemdict
 
+def expand_gridlook_levels(itemdict:dict,variables:list=None)->dict:
+    """Turn compact gridlook levels back into one datasource per variable.
+
+    The full layout has an entry for every variable of the dataset. Pass
+    variables=list(ds.variables) to restore it exactly. Without it, the
+    dimensions of cube:dimensions and the data variables of the item are
+    used, which misses coordinates that are not dimensions.
+    """
+    if variables is None:
+        dims=list(itemdict["properties"].get("cube:dimensions",{}))
+        variables=[*dims,*[v for v in itemdict["properties"].get("variables",[]) if v not in dims]]
+    for level in itemdict.get("levels",[]):
+        default=level.pop("datasource",None)
+        if default is None:
+            continue
+        overrides=level.get("datasources",{})
+        level["datasources"]={
+            var_name:dict(overrides.get(var_name,default))
+            for var_name in [*variables,*[v for v in overrides if v not in variables]]
+        }
+    return itemdict
+
+def get_asset_dict(
+    href:str,
+    media_type:str,
+    title:str,
+    description:str,
+    roles:list,
+    extra_fields:dict=None
+) -> dict:
+    """Asset as in pystac's Asset.to_dict()"""
+    asset=dict(href=href,type=media_type,title=title,description=description)
+    if extra_fields:
+        asset.update(extra_fields)
+    asset["roles"]=roles
+    return asset
+
+def get_volume_fields(ds:xr.Dataset,stored_sizes:dict=None) -> dict:
+    fields={
+        'Volume':str(int(ds.nbytes/1024**3)) + " GB uncompressed",
+        'No of data variables':str(len(ds.data_vars))
+    }
+    if stored_sizes:
+        fields['Volume stored']=str(round(sum(s["bytes"] for s in stored_sizes.values())/1024**3,2)) + " GB compressed"
+        fields['No of chunks']=str(sum(s["chunks"] for s in stored_sizes.values()))
+    return fields
+
+def get_dataset_stored_sizes(ds:xr.Dataset,href:str) -> dict:
+    return get_stored_sizes(
+        href,
+        list(ds.variables),
+        storage_options=ds.attrs.get("open_storage_options")
+    )
+
+def get_open_config(ds:xr.Dataset,href:str) -> dict:
+    open_kwargs=ds.attrs.get("open_kwargs")
+    open_config={
+        "xarray:open_kwargs":open_kwargs if open_kwargs else (copy(XARRAY_DEF)|copy(XARRAY_ZARR)),
+        "xarray:storage_options":ds.attrs.get("open_storage_options")
+    }
+    if href.startswith("reference"):
+        if not open_config["xarray:storage_options"]:
+            open_config["xarray:storage_options"]=copy(XSO)
+        if not open_kwargs:
+            open_config["xarray:open_kwargs"]=(copy(XARRAY_DEF)|copy(XARRAY_KERCHUNK))
+    return open_config
+
+def get_eerie_cloud_asset_dict(href:str,extra_fields:dict) -> dict:
+    href_kerchunk='/'.join(href.split('/')[:-1])+"/kerchunk"
+    href_zarr='/'.join(href.split('/')[:-1])+"/zarr"
+    alternate=copy(ALTERNATE_KERCHUNK)
+    alternate["processed"]["href"]=href_zarr
+    alternate["processed"]["name"]="Rechunked and uniformly compressed data"
+    return get_asset_dict(
+        href_kerchunk,
+        MediaType.ZARR,
+        "Zarr-access through eerie cloud",
+        "Chunk-based access on raw-encoded data",
+        ["data"],
+        extra_fields={**extra_fields,"alternate":alternate}
+    )
+
+def apply_attrs_policy(attrs:dict,item_id:str,attrs_policy:dict=None) -> tuple:
+    """Split attrs by the byte limits of the policy. Oversized attributes are
+    written to a sidecar json. Returns the attrs to keep and the sidecar
+    asset or None."""
+    policy=ATTRS_POLICY|(attrs_policy or dict())
+    kept,externalized=split_oversized_attrs(
+        attrs,policy["max_attr_bytes"],policy["max_attrs_bytes"]
+    )
+    if not externalized:
+        return kept,None
+    if not policy["sidecar_target"]:
+        print(f"Dropped oversized attributes {list(externalized)} of item {item_id}")
+        return kept,None
+    fn=f"{item_id}.attrs.json"
+    target=policy["sidecar_target"].rstrip('/')+'/'+fn
+    with fsspec.open(target,"w") as f:
+        f.write(dumps(externalized))
+    href=(policy["sidecar_href"] or policy["sidecar_target"]).rstrip('/')+'/'+fn
+    return kept,get_asset_dict(
+        href,
+        MediaType.JSON,
+        "Dataset attributes",
+        "Global attributes that exceed the size limits of the item properties",
+        ["metadata"],
+        extra_fields={"attrs:keys":list(externalized)}
+    )
+
 def add_eerie_cloud_asset(
     item:Item,
     href:str, 
@@ -328,21 +706,8 @@ def add_links(itemdict:dict,l_eeriecloud:bool)->dict:
             ))
     return itemdict
 
-def make_json_serializable(obj):
-    """Recursively convert non-JSON serializable values to serializable formats."""
-    if isinstance(obj, dict):
-        return {key: make_json_serializable(value) for key, value in obj.items()}
-    elif isinstance(obj, bytes):
-        return obj.decode(errors="ignore")  # Convert bytes to string
-    else:
-        try:
-            json.dumps(obj)  # Test if serializable
-            return obj  # If it works, return as is
-        except (TypeError, OverflowError):
-            return str(obj)  # Convert unsupported types to strings
-    
-def get_item_id(ds:xr.Dataset,ds_attrs:dict,l_eeriecloud:bool)->str:
-    global ID_TEMPLATE
+def get_item_id(ds:xr.Dataset,ds_attrs:dict,l_eeriecloud:bool,config:StacItemConfig=None)->str:
+    id_template=get_item_config(config).id_template
     if l_eeriecloud:
         if not ds_attrs["_xpublish_id"]:
             raise ValueError(
@@ -352,10 +717,10 @@ def get_item_id(ds:xr.Dataset,ds_attrs:dict,l_eeriecloud:bool)->str:
     source=ds.encoding.get("source")
     if source:
         return source.replace('/','-').replace(':','_').replace('.','-')
-    if ID_TEMPLATE:
-        item_id=copy(ID_TEMPLATE)
-        for elem in ID_TEMPALTE.split('-'):
-            item_id=item_id.replace(elem,ds.attrs.get(elem))
+    if id_template:
+        item_id=id_template
+        for elem in id_template.split('-'):
+            item_id=item_id.replace(elem,str(ds.attrs.get(elem,elem)))
         return item_id
     return "template"
 
@@ -369,155 +734,322 @@ def xarray_dataset_to_stac_item(
     asset_access="dkrz-disk",
     l_eeriecloud:bool=False,
     l_cubeextension:bool=True,
-    l_gridlook:bool=True
-) -> Item:
+    l_gridlook:bool=True,
+    l_compact_gridlook:bool=False,
+    l_chunklayout:bool=True,
+    l_probe_chunks:bool=False,
+    l_stored_volume:bool=False,
+    l_time_axis:bool=True,
+    attrs_policy:dict=None,
+    json_backend:str="json",
+    config:StacItemConfig=None
+) -> dict:
+    """Item dict of ds from xarray_dataset_to_stac_itemdict, passed through
+    pystac.Item so that pystac normalizes it."""
+    itemdict=xarray_dataset_to_stac_itemdict(
+        ds,
+        ds_format=ds_format,
+        item_id=item_id,
+        collection_id=collection_id,
+        exp_license=exp_license,
+        title=title,
+        asset_access=asset_access,
+        l_eeriecloud=l_eeriecloud,
+        l_cubeextension=l_cubeextension,
+        l_gridlook=l_gridlook,
+        l_compact_gridlook=l_compact_gridlook,
+        l_chunklayout=l_chunklayout,
+        l_probe_chunks=l_probe_chunks,
+        l_stored_volume=l_stored_volume,
+        l_time_axis=l_time_axis,
+        attrs_policy=attrs_policy,
+        json_backend=json_backend,
+        config=config
+    )
+    return Item.from_dict(itemdict).to_dict()
+
+def xarray_dataset_to_stac_itemdict(
+    ds:xr.Dataset,
+    ds_format:str="zarr",
+    item_id:str=None,
+    collection_id:str=None,
+    exp_license:str=None,
+    title:str=None,
+    asset_access="dkrz-disk",
+    l_eeriecloud:bool=False,
+    l_cubeextension:bool=True,
+    l_gridlook:bool=True,
+    l_compact_gridlook:bool=False,
+    l_chunklayout:bool=True,
+    l_probe_chunks:bool=False,
+    l_stored_volume:bool=False,
+    l_time_axis:bool=True,
+    l_validate:bool=False,
+    attrs_policy:dict=None,
+    json_backend:str="json",
+    config:StacItemConfig=None
+) -> dict:
+    """STAC item dict of ds, built directly without pystac objects and
+    without deep copies. xarray_dataset_to_stac_item wraps it.
 
+    With l_validate, the result is validated with pystac (needs jsonschema).
+    """
     if ds_format != "zarr":
         raise ValueError("No other formats than zarr yet implemented.")
-    #default
-    stac_extensions=copy(STAC_EXTENSIONS)
-    ds_attrs=get_from_attrs(copy(NEEDED_ATTRS),ds)
+    config=get_item_config(config)
+    ds_attrs=get_from_attrs(NEEDED_ATTRS,ds)
     if not item_id:
-        item_id=get_item_id(ds,ds_attrs,l_eeriecloud)
+        item_id=get_item_id(ds,ds_attrs,l_eeriecloud,config)
     if not title:
         title=ds_attrs.get("title", item_id)
     if not ds_attrs.get("time_min"):
         ds_attrs["time_min"], ds_attrs["time_max"] = get_time_min_max(ds)
+    grid_info=dict()
     if not ds_attrs.get("bbox"):
-        ds_attrs["bbox"]=get_bbox(ds)
-        
-    stac_href=HOSTURL+"/"+item_id
+        grid_info=get_grid_info(ds,config)
+        ds_attrs["bbox"]=grid_info["bbox"]
+
+    stac_href=config.hosturl+"/"+item_id
     if collection_id:
-        stac_href=f'{HOSTURL}/collections/{collection_id}/items/{item_id}'
-        
-    providers=get_providers(ds_attrs)
-    license=get_spdx_license(exp_license)
-    
-    properties={
-            "title": title,
-            "description": ds_attrs.get("description",get_description(ds,stac_href)),
-            "created":ds_attrs["creation_date"],
-            "keywords":get_keywords(title),
-            "providers":providers,
-            "license":license
-        }
+        stac_href=f'{config.hosturl}/collections/{collection_id}/items/{item_id}'
+    href=ds.encoding.get("source",ds.attrs.get("href"))
 
-    datetimeattr=datetime.now()
+    properties={
+        "title": title,
+        "description": ds_attrs.get("description",get_description(ds,stac_href)),
+        "created":ds_attrs["creation_date"],
+        "keywords":get_keywords(title),
+        "providers":get_providers(ds_attrs,config),
+        "license":get_spdx_license(exp_license)
+    }
     if ds_attrs.get("time_min"):
-        datetimeattr=None
         properties["start_datetime"]=ds_attrs["time_min"]
         properties["end_datetime"]=ds_attrs["time_max"]
+        properties["datetime"]=None
+    else:
+        properties["datetime"]=datetime_to_str(datetime.now())
+    if l_time_axis:
+        properties.update(get_time_axis_properties(ds))
+    if grid_info.get("id"):
+        properties["grid:id"]=grid_info["id"]
+        if grid_info.get("ncells"):
+            properties["grid:ncells"]=grid_info["ncells"]
 
-    geometry=get_geometry(ds_attrs["bbox"])
-    #geometry=get_geometry(get_bbox(ds))
-    
-    
-    cube=get_cube_extension(ds, ds_attrs["time_min"],ds_attrs["time_max"])
-        
-    # Create a STAC item
-    item = Item(
-        id=item_id,
-        geometry=geometry,
-        bbox=ds_attrs["bbox"],
-        #bbox=get_bbox(ds),
-        datetime=datetimeattr,
-        properties=properties,
-        stac_extensions=stac_extensions
+    compressed_chunk_bytes=None
+    if l_chunklayout and l_probe_chunks and href:
+        compressed_chunk_bytes=get_compressed_chunk_bytes(ds,href)
+    stored_sizes=None
+    if l_stored_volume and href:
+        stored_sizes=get_dataset_stored_sizes(ds,href)
+    cube=get_cube_extension(
+        ds, ds_attrs["time_min"],ds_attrs["time_max"],
+        l_chunklayout=l_chunklayout,
+        compressed_chunk_bytes=compressed_chunk_bytes,
+        stored_sizes=stored_sizes
     )
-    href=ds.encoding.get("source",ds.attrs.get("href"))    
+    if l_cubeextension:
+        properties.update(cube)
+    properties["variables"]=list(cube["cube:variables"].keys())
+    if "crs" in ds.variables:
+        properties["zoom"]=int(math.log2(int(ds["crs"].attrs["healpix_nside"])))
+
+    assets=dict()
     if l_gridlook:
-        gridlook_href=GRIDLOOK+"#"+stac_href
-        if L_API and href:
-            gridlook_href=GRIDLOOK+"#"+href        
-        item.add_asset(
-            "gridlook",
-            Asset(
-                href=gridlook_href,
-                media_type=MediaType.HTML,
-                title="Visualization with gridlook",
-                roles=["Visualization"],
-                description="Visualization with gridlook"
-            )
+        gridlook_href=config.gridlook+"#"+stac_href
+        if config.l_api and href:
+            gridlook_href=config.gridlook+"#"+href
+        assets["gridlook"]=get_asset_dict(
+            gridlook_href,
+            MediaType.HTML,
+            "Visualization with gridlook",
+            "Visualization with gridlook",
+            ["Visualization"]
         )
-
-    extra_fields={
-        'Volume':str(int(ds.nbytes/1024**3)) + " GB uncompressed",
-        'No of data variables':str(len(ds.data_vars))
-    }
+    extra_fields=get_volume_fields(ds,stored_sizes)
     if href:
-        open_kwargs=ds.attrs.get("open_kwargs")
-        open_config={
-            "xarray:open_kwargs":open_kwargs if open_kwargs else (copy(XARRAY_DEF)|copy(XARRAY_ZARR)),
-            "xarray:storage_options":ds.attrs.get("open_storage_options")
-        }
-        if href.startswith("reference"):
-            if not open_config["xarray:storage_options"]:
-                open_config["xarray:storage_options"]=copy(XSO)
-            if not open_kwargs:
-                open_config["xarray:open_kwargs"]=(copy(XARRAY_DEF)|copy(XARRAY_KERCHUNK))
-        extra_fields.update(open_config)
+        extra_fields.update(get_open_config(ds,href))
         access_title="Zarr-access on dkrz"
         if href.startswith("http"):
             access_title="Zarr-access through cloud storage"
-        item.add_asset(
-                asset_access,
-                Asset(
-                    href=href,
-                    media_type=MediaType.ZARR,
-                    roles=["data"],
-                    title=access_title,
-                    description="Chunk-based access on raw data",
-                    extra_fields=copy(extra_fields)
-                )
+        assets[asset_access]=get_asset_dict(
+            href,
+            MediaType.ZARR,
+            access_title,
+            "Chunk-based access on raw data",
+            ["data"],
+            extra_fields=extra_fields
         )
-        if l_eeriecloud:
-            item=add_eerie_cloud_asset(item, extra_fields, alternate=True)
     if l_eeriecloud:
-        item=add_eerie_cloud_asset(item, extra_fields)
-        item.add_asset(
-            "xarray_view",
-            Asset(
-                href=defaults["EERIE_CLOUD_URL"]+"/"+item_id+"/",
-                media_type=MediaType.HTML,
-                title="Xarray dataset",
-                roles=["overview"],
-                description="HTML representation of the xarray dataset"
-            )
+        assets["eerie-cloud"]=get_eerie_cloud_asset_dict(
+            defaults["EERIE_CLOUD_URL"]+"/"+item_id+"/zarr",
+            extra_fields
         )
-        item.add_asset(
-            "jupyterlite",
-            Asset(
-                href=JUPYTERLITE,
-                media_type=MediaType.HTML,
-                title="Jupyterlite access",
-                roles=["analysis"],
-                description="Web-assembly based analysis platform with access to this item"
-            )
+        assets["xarray_view"]=get_asset_dict(
+            defaults["EERIE_CLOUD_URL"]+"/"+item_id+"/",
+            MediaType.HTML,
+            "Xarray dataset",
+            "HTML representation of the xarray dataset",
+            ["overview"]
         )
-    itemdict=item.to_dict()
-#    for asset in itemdict["assets"].keys():
+        assets["jupyterlite"]=get_asset_dict(
+            config.jupyterlite,
+            MediaType.HTML,
+            "Jupyterlite access",
+            "Web-assembly based analysis platform with access to this item",
+            ["analysis"]
+        )
+
+    itemdict={
+        "type":"Feature",
+        "stac_version":get_stac_version(),
+        "stac_extensions":list(STAC_EXTENSIONS),
+        "id":item_id,
+        "geometry":get_geometry(ds_attrs["bbox"]),
+        "bbox":ds_attrs["bbox"],
+        "properties":properties,
+        "links":[],
+        "assets":assets
+    }
     itemdict=add_links(itemdict,l_eeriecloud)
-    #
-    #gridlook
-    #
     if l_gridlook:
         itemdict=get_gridlook(
-            itemdict,href,ds,l_eeriecloud
+            itemdict,href,ds,l_eeriecloud,l_compact=l_compact_gridlook,config=config
         )
 
-    if l_cubeextension:
-        itemdict["properties"].update(cube)
-        
-    itemdict["properties"]["variables"]=list(itemdict["properties"]["cube:variables"].keys())
-    if "crs" in ds.variables:
-        zoomint=math.log2(int(ds["crs"].attrs["healpix_nside"]))
-        itemdict["properties"]["zoom"]=int(math.log2(int(ds["crs"].attrs["healpix_nside"])))
-        
-    for dsatt,dsattval in ds.attrs.items():
-        if not dsatt in itemdict["properties"] and not dsatt in itemdict and not "time" in dsatt.lower():
-            itemdict["properties"][dsatt]=dsattval
+    attrs={
+        dsatt:dsattval for dsatt,dsattval in ds.attrs.items()
+        if not dsatt in properties and not dsatt in itemdict and not "time" in dsatt.lower()
+    }
+    attrs,attrs_asset=apply_attrs_policy(attrs,item_id,attrs_policy)
+    properties.update(attrs)
+    if attrs_asset:
+        assets["attributes"]=attrs_asset
 
-    itemdict=make_json_serializable(itemdict)
+    itemdict=make_json_serializable(itemdict,backend=json_backend)
+    if l_validate:
+        Item.from_dict(itemdict).validate()
+    return itemdict
+
+def zarr_metadata_to_stac_item(
+    href:str,
+    storage_options:dict=None,
+    open_kwargs:dict=None,
+    max_coord_size:int=SMALL_COORD_SIZE,
+    l_direct:bool=False,
+    **kwargs
+) -> dict:
+    """Like xarray_dataset_to_stac_item but from the consolidated metadata
+    of the zarr store at href. Only time, lat, lon and the dimension
+    coordinates are read from the store. With l_direct, the item is built by
+    xarray_dataset_to_stac_itemdict.
+    """
+    ds=open_zarr_metadata(href,storage_options=storage_options,max_coord_size=max_coord_size)
+    if open_kwargs:
+        ds.attrs["open_kwargs"]=open_kwargs
+    if storage_options:
+        ds.attrs["open_storage_options"]=storage_options
+    if l_direct:
+        return xarray_dataset_to_stac_itemdict(ds,**kwargs)
+    return xarray_dataset_to_stac_item(ds,**kwargs)
+
+def get_healpix_ncells(zoom:int) -> int:
+    return 12*4**zoom
+
+def get_healpix_hrefs(href_template:str,zooms=None) -> dict:
+    """Format href_template with {zoom} or {nside} for each zoom."""
+    if zooms is None:
+        zooms=range(MAX_HEALPIX_ZOOM+1)
+    return {zoom:href_template.format(zoom=zoom,nside=2**zoom) for zoom in zooms}
+
+def _read_metadata_or_none(href:str,storage_options:dict=None):
+    try:
+        return read_consolidated_metadata(href,storage_options)
+    except (ValueError,KeyError,OSError):
+        return None
+
+def discover_healpix_zooms(
+    href_template:str,
+    zooms=None,
+    storage_options:dict=None,
+    max_workers:int=LISTING_WORKERS
+) -> dict:
+    """Consolidated metadata of all existing zoom levels, read in parallel."""
+    hrefs=get_healpix_hrefs(href_template,zooms)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        metadatas=pool.map(lambda href:_read_metadata_or_none(href,storage_options),hrefs.values())
+    return {
+        zoom:dict(href=href,metadata=metadata)
+        for (zoom,href),metadata in zip(hrefs.items(),metadatas)
+        if metadata is not None
+    }
+
+def get_healpix_zoom_fields(zoom:int,metadata:dict) -> dict:
+    """Zoom, nside, cell count and volume from the metadata only."""
+    ncells=get_healpix_ncells(zoom)
+    nbytes=sum(
+        int(np.prod(array["shape"]))*get_numpy_dtype(array["dtype"]).itemsize
+        for array in metadata["arrays"].values()
+    )
+    sizes={
+        dim:size for array in metadata["arrays"].values()
+        for dim,size in zip(array["dims"],array["shape"])
+    }
+    return {
+        "healpix:zoom":zoom,
+        "healpix:nside":2**zoom,
+        "healpix:ncells":ncells,
+        "healpix:global":ncells in sizes.values(),
+        "Volume":str(int(nbytes/1024**3)) + " GB uncompressed"
+    }
+
+def healpix_pyramid_to_stac_item(
+    href_template:str,
+    zooms=None,
+    storage_options:dict=None,
+    open_kwargs:dict=None,
+    asset_access:str="dkrz-disk",
+    max_coord_size:int=SMALL_COORD_SIZE,
+    **kwargs
+) -> dict:
+    """One item for all zoom levels of a HEALPix dataset.
+
+    href_template contains {zoom} or {nside}. All zooms up to
+    MAX_HEALPIX_ZOOM (or zooms) are probed in parallel, the item is built
+    from the metadata of the finest one and gets one asset per zoom. The
+    bbox is global if the cell dimension has 12*4**zoom cells.
+    """
+    levels=discover_healpix_zooms(href_template,zooms,storage_options)
+    if not levels:
+        raise ValueError(f"No zoom level found for {href_template}")
+    finest=max(levels)
+    ds=open_zarr_metadata(
+        levels[finest]["href"],storage_options=storage_options,max_coord_size=max_coord_size
+    )
+    if open_kwargs:
+        ds.attrs["open_kwargs"]=open_kwargs
+    if storage_options:
+        ds.attrs["open_storage_options"]=storage_options
+    zoom_fields={zoom:get_healpix_zoom_fields(zoom,level["metadata"]) for zoom,level in levels.items()}
+    if zoom_fields[finest]["healpix:global"]:
+        ds.attrs["bbox"]=[-180.,-90.,180.,90.]
+    if not kwargs.get("item_id") and not kwargs.get("l_eeriecloud"):
+        kwargs["item_id"]=(
+            href_template.replace("{zoom}","").replace("{nside}","")
+            .replace('/','-').replace(':','_').replace('.','-')
+        )
+    itemdict=xarray_dataset_to_stac_itemdict(ds,asset_access=asset_access,**kwargs)
+    itemdict["properties"]["zoom"]=finest
+    itemdict["properties"]["healpix:zooms"]=sorted(levels)
+    open_config=get_open_config(ds,levels[finest]["href"])
+    for zoom in sorted(levels):
+        itemdict["assets"][f"zoom{zoom}"]=get_asset_dict(
+            levels[zoom]["href"],
+            MediaType.ZARR,
+            f"HEALPix zoom level {zoom}",
+            f"Chunk-based access on zoom level {zoom} with {zoom_fields[zoom]['healpix:ncells']} cells",
+            ["data"],
+            extra_fields={**zoom_fields[zoom],**open_config}
+        )
     return itemdict
 
 def add_asset_for_ds(
@@ -529,22 +1061,8 @@ def add_asset_for_ds(
     href=ds.encoding.get("source",ds.attrs.get("href")) 
     if not href:
         raise ValueError("Neither found 'source' in encoding nor 'ref' in attributes")
-    extra_fields={
-        'Volume':str(int(ds.nbytes/1024**3)) + " GB uncompressed",
-        'No of data variables':str(len(ds.data_vars))
-    }     
-    open_kwargs=ds.attrs.get("open_kwargs")
-    open_config={
-        "xarray:open_kwargs":open_kwargs if open_kwargs else (copy(XARRAY_DEF)|copy(XARRAY_ZARR)),
-        "xarray:storage_options":ds.attrs.get("open_storage_options")
-    }
-    if href.startswith("reference"):
-        if not open_config["xarray:storage_options"]:
-            open_config["xarray:storage_options"]=copy(XSO)
-        if not open_kwargs:
-            open_config["xarray:open_kwargs"]=(copy(XARRAY_DEF)|copy(XARRAY_KERCHUNK))
-            
-    extra_fields.update(open_config)
+    extra_fields=get_volume_fields(ds)
+    extra_fields.update(get_open_config(ds,href))
     access_title="Zarr-access from Lustre"    
     if k == "dkrz-disk":
         newhref=href
@@ -610,25 +1128,30 @@ def get_item_from_source(
     title:str=None,
     collection_id:str=None,
     exp_license:str=None,
-    l_eeriecloud:bool=False
+    l_eeriecloud:bool=False,
+    attrs_policy:dict=None,
+    l_time_axis:bool=True,
+    config:StacItemConfig=None
 ) -> Item:
-    global HOSTURL
+    config=get_item_config(config)
     stac_extensions=copy(STAC_EXTENSIONS)
     ds_attrs=get_from_attrs(copy(NEEDED_ATTRS),ds)
     if not item_id:
-        item_id=get_item_id(ds,ds_attrs,l_eeriecloud)
+        item_id=get_item_id(ds,ds_attrs,l_eeriecloud,config)
     if not title:
         title=ds_attrs.get("title", item_id)
     if not ds_attrs.get("time_min"):
         ds_attrs["time_min"], ds_attrs["time_max"] = get_time_min_max(ds)
+    grid_info=dict()
     if not ds_attrs.get("bbox"):
-        ds_attrs["bbox"]=get_bbox(ds)
+        grid_info=get_grid_info(ds,config)
+        ds_attrs["bbox"]=grid_info["bbox"]
         
-    stac_href=HOSTURL+"/"+item_id
+    stac_href=config.hosturl+"/"+item_id
     if collection_id:
-        stac_href=f'{HOSTURL}/collections/{collection_id}/items/{item_id}'
+        stac_href=f'{config.hosturl}/collections/{collection_id}/items/{item_id}'
         
-    providers=get_providers(ds_attrs)
+    providers=get_providers(ds_attrs,config)
     license=get_spdx_license(exp_license)
     cube=get_cube_extension(ds, ds_attrs["time_min"],ds_attrs["time_max"])    
     
@@ -646,15 +1169,24 @@ def get_item_from_source(
         zoomint=math.log2(int(ds["crs"].attrs["healpix_nside"]))
         properties["zoom"]=int(math.log2(int(ds["crs"].attrs["healpix_nside"])))
 
-    for dsatt,dsattval in ds.attrs.items():
-        if not properties.get(dsatt) and not "time" in dsatt.lower():
-            properties[dsatt]=dsattval
+    attrs={
+        dsatt:dsattval for dsatt,dsattval in ds.attrs.items()
+        if not properties.get(dsatt) and not "time" in dsatt.lower()
+    }
+    attrs,attrs_asset=apply_attrs_policy(attrs,item_id,attrs_policy)
+    properties.update(attrs)
         
     datetimeattr=datetime.now()
     if ds_attrs.get("time_min"):
         datetimeattr=None
         properties["start_datetime"]=ds_attrs["time_min"]
         properties["end_datetime"]=ds_attrs["time_max"]
+    if l_time_axis:
+        properties.update(get_time_axis_properties(ds))
+    if grid_info.get("id"):
+        properties["grid:id"]=grid_info["id"]
+        if grid_info.get("ncells"):
+            properties["grid:ncells"]=grid_info["ncells"]
 
     geometry=get_geometry(ds_attrs["bbox"])
         
@@ -668,20 +1200,64 @@ def get_item_from_source(
         properties=properties,
         stac_extensions=stac_extensions
     )
+    if attrs_asset:
+        item.add_asset("attributes",Asset.from_dict(attrs_asset))
 
     return item
 
+def open_dataset_spec(spec,coords:list=None):
+    """A dataset for spec, which is an opened dataset, an href or a
+    dict(href, storage_options, open_kwargs). Hrefs are only opened by
+    their consolidated metadata."""
+    if isinstance(spec,(xr.Dataset,ZarrMetadataDataset)):
+        return spec
+    if isinstance(spec,str):
+        spec=dict(href=spec)
+    ds=open_zarr_metadata(spec["href"],storage_options=spec.get("storage_options"),coords=coords)
+    if spec.get("open_kwargs"):
+        ds.attrs["open_kwargs"]=spec["open_kwargs"]
+    if spec.get("storage_options"):
+        ds.attrs["open_storage_options"]=spec["storage_options"]
+    return ds
+
 def xarray_zarr_datasets_to_stac_item(
     dset_dict:dict,
     item_id:str=None,
     collection_id:str=None,
     exp_license:str=None,
-    title:str=None
+    title:str=None,
+    attrs_policy:dict=None,
+    json_backend:str="json",
+    config:StacItemConfig=None,
+    l_check_alternates:bool=True
 ) ->dict:
+    """One item with an asset per access method in dset_dict.
+
+    The first entry is the primary dataset, ideally already opened. The
+    others can be hrefs or dict(href, storage_options, open_kwargs) specs
+    which are only read by their consolidated metadata. With
+    l_check_alternates, their signature must match the primary one.
+    """
     if not any(v for k,v in dset_dict.items()):
         raise ValueError("Need a dataset to start with")
-    item_ds=dset_dict[list(dset_dict.keys())[0]]
-    item=get_item_from_source(item_ds,item_id,title,collection_id,exp_license)
+    config=get_item_config(config)
+    primary_key=list(dset_dict.keys())[0]
+    dset_dict={
+        k:open_dataset_spec(spec,coords=None if k == primary_key else [])
+        for k,spec in dset_dict.items()
+    }
+    item_ds=dset_dict[primary_key]
+    if l_check_alternates:
+        signature=get_signature(item_ds)
+        for k,ds in dset_dict.items():
+            if k != primary_key and get_signature(ds) != signature:
+                raise ValueError(
+                    f"The '{k}' dataset {ds.encoding.get('source')} does not match "
+                    f"the '{primary_key}' dataset in variables, dims, shapes or dtypes"
+                )
+    item=get_item_from_source(
+        item_ds,item_id,title,collection_id,exp_license,attrs_policy=attrs_policy,config=config
+    )
     for k,ds in dset_dict.items():
         item=add_asset_for_ds(item,k,ds,item_id)
         
@@ -693,14 +1269,14 @@ def xarray_zarr_datasets_to_stac_item(
         item.add_asset(
             "jupyterlite",
             Asset(
-                href=JUPYTERLITE,
+                href=config.jupyterlite,
                 media_type=MediaType.HTML,
                 title="Jupyterlite access",
                 roles=["analysis"],
                 description="Web-assembly based analysis platform with access to this item"
             )
         ) 
-        gridlook_href=GRIDLOOK+"#"
+        gridlook_href=config.gridlook+"#"
         if "eerie-cloud" in dscloud.encoding["source"]:
             gridlook_href+="/".join(dscloud.encoding["source"].split('/')[:-1]+["stac"])
         else:
@@ -717,7 +1293,7 @@ def xarray_zarr_datasets_to_stac_item(
         )
         
     itemdict=item.to_dict()
-    itemdict=make_json_serializable(itemdict)
+    itemdict=make_json_serializable(itemdict,backend=json_backend)
     
     return itemdict
         
\ No newline at end of file
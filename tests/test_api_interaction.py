@@ -0,0 +1,359 @@
+"""Tests of the STAC transaction functions against a local stand-in server."""
+
+import gzip
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from tocatalogs.stac.utils.api_interaction import (
+    RateLimiter,
+    StacApiError,
+    UpsertManifest,
+    _send_json,
+    api_bulk_create_items,
+    api_create_items,
+    api_create_or_update_collection,
+    api_create_or_update_item,
+    api_delete_collections,
+    api_iter_collections,
+    api_upsert_collection,
+    api_upsert_item,
+    api_upsert_items,
+    get_collection_index,
+    get_session,
+)
+from tocatalogs.stac.utils.misc import delete_all_collections_by_prefix
+
+
+class StandInStacServer(ThreadingHTTPServer):
+    """Minimal in-memory STAC transactions API served from a thread.
+
+    fail_next maps a path to a list of statuses returned before the request
+    is handled normally. Without l_bulk, the bulk_items endpoint is missing.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, l_bulk: bool = True):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.l_bulk = l_bulk
+        self.collections = {}
+        self.items = {}
+        self.fail_next = {}
+        self.requests = []
+        self.lock = threading.Lock()
+        self.url = f"http://127.0.0.1:{self.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, args=(0.01,), daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def send(self, status: int, body: dict = None, etag: str = None):
+        content = json.dumps(body or {}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def read_json(self):
+        content = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.headers.get("Content-Encoding") == "gzip":
+            content = gzip.decompress(content)
+        return json.loads(content) if content else None
+
+    def handle_request(self):
+        server = self.server
+        url = urlsplit(self.path)
+        body = self.read_json()
+        with server.lock:
+            server.requests.append((self.command, url.path, dict(self.headers), parse_qs(url.query)))
+            failures = server.fail_next.get(url.path)
+            if failures:
+                return self.send(failures.pop(0), dict(detail="try again"))
+            parts = url.path.strip("/").split("/")
+            return self.route(self.command, parts, body, parse_qs(url.query))
+
+    do_GET = do_POST = do_PUT = do_DELETE = handle_request
+
+    def route(self, method, parts, body, query):
+        server = self.server
+        if parts == ["collections"]:
+            if method == "POST":
+                if body["id"] in server.collections:
+                    return self.send(409, dict(detail="exists"))
+                server.collections[body["id"]] = body
+                return self.send(201, body)
+            return self.list_collections(query)
+        cid = parts[1]
+        if len(parts) == 2:
+            if method == "PUT":
+                if cid not in server.collections:
+                    return self.send(404, dict(detail="not found"))
+                server.collections[cid] = body
+                return self.send(200, body)
+            collection = server.collections.pop(cid, None) if method == "DELETE" else server.collections.get(cid)
+            return self.send(200, collection) if collection else self.send(404, dict(detail="not found"))
+        if parts[2] == "bulk_items":
+            if not server.l_bulk:
+                return self.send(404, dict(detail="not found"))
+            for iid, item in body["items"].items():
+                server.items[(cid, iid)] = item
+            return self.send(200, dict(detail=f"{len(body['items'])} items"))
+        if len(parts) == 3:
+            if (cid, body["id"]) in server.items:
+                return self.send(409, dict(detail="exists"))
+            server.items[(cid, body["id"])] = body
+            return self.send(201, body, etag=f'"{len(server.requests)}"')
+        key = (cid, parts[3])
+        if key not in server.items:
+            return self.send(404, dict(detail="not found"))
+        if method == "PUT":
+            server.items[key] = body
+            return self.send(200, body, etag=f'"{len(server.requests)}"')
+        if method == "DELETE":
+            return self.send(200, server.items.pop(key))
+        return self.send(200, server.items[key])
+
+    def list_collections(self, query):
+        limit = int(query.get("limit", ["10"])[0])
+        start = int(query.get("token", ["0"])[0])
+        cids = sorted(self.server.collections)[start : start + limit]
+        fields = query.get("fields", [None])[0]
+        collections = [self.server.collections[cid] for cid in cids]
+        if fields:
+            collections = [
+                {key: value for key, value in collection.items() if key in fields.split(",")}
+                for collection in collections
+            ]
+        links = []
+        if start + limit < len(self.server.collections):
+            href = f"{self.server.url}/collections?limit={limit}&token={start + limit}"
+            links.append(dict(rel="next", href=href + (f"&fields={fields}" if fields else "")))
+        return self.send(200, dict(collections=collections, links=links))
+
+
+def make_items(n):
+    return [dict(id=f"i{i}", properties=dict(a=i)) for i in range(n)]
+
+
+def test_send_json_with_gzip():
+    with StandInStacServer() as server:
+        session = get_session(2)
+        adapter = session.get_adapter(server.url)
+        assert adapter._pool_maxsize == 2
+        resp = _send_json(session, "POST", f"{server.url}/collections", dict(id="c1", title="ä"), l_gzip=True)
+        assert resp.status_code == 201
+    assert server.collections["c1"] == dict(id="c1", title="ä")
+    assert server.requests[0][2]["Content-Encoding"] == "gzip"
+
+
+@pytest.mark.parametrize("l_gzip", [False, True])
+def test_create_items_in_parallel(l_gzip):
+    items = make_items(20)
+    with StandInStacServer() as server:
+        server.items[("c1", "i3")] = dict(id="i3", properties=dict(a=-1))
+        assert api_create_items(server.url, "c1", items, max_workers=4, l_gzip=l_gzip) == 20
+    assert len(server.items) == 20
+    assert server.items[("c1", "i3")]["properties"]["a"] == 3
+    assert [request[:2] for request in server.requests].count(("PUT", "/collections/c1/items/i3")) == 1
+
+
+def test_create_items_reports_all_failures():
+    with StandInStacServer() as server:
+        server.fail_next["/collections/c1/items"] = [500, 500]
+        with pytest.raises(StacApiError) as excinfo:
+            api_create_items(server.url, "c1", make_items(5), max_workers=1)
+    assert excinfo.value.status_code == 500
+    assert "2 of 5" in str(excinfo.value)
+    assert len(server.items) == 3
+
+
+def test_bulk_create_items():
+    with StandInStacServer() as server:
+        counts = api_bulk_create_items(server.url, "c1", make_items(25), batch_size=10, l_gzip=True)
+    assert counts == dict(bulk=25, single=0)
+    assert len(server.items) == 25
+    assert [request[1] for request in server.requests].count("/collections/c1/bulk_items") == 3
+
+
+def test_bulk_create_items_falls_back_to_single_items():
+    with StandInStacServer(l_bulk=False) as server:
+        counts = api_bulk_create_items(server.url, "c1", make_items(25), batch_size=10, max_workers=4)
+    assert counts == dict(bulk=0, single=25)
+    assert len(server.items) == 25
+
+
+def test_bulk_create_items_raises_on_errors():
+    with StandInStacServer() as server:
+        server.fail_next["/collections/c1/bulk_items"] = [400]
+        with pytest.raises(StacApiError) as excinfo:
+            api_bulk_create_items(server.url, "c1", make_items(25), batch_size=10)
+    assert excinfo.value.status_code == 400
+    assert "items 0 to 10" in str(excinfo.value)
+    assert server.items == {}
+
+
+def get_calls(server):
+    return [request[:2] for request in server.requests]
+
+
+def test_upsert_items_skips_unchanged(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    items = make_items(10)
+    with StandInStacServer() as server:
+        counts = api_upsert_items(server.url, "c1", items, UpsertManifest(path), max_workers=4)
+        assert counts == dict(skipped=0, created=10, updated=0)
+        server.requests.clear()
+        items[4]["properties"]["a"] = -4
+        manifest = UpsertManifest(path)
+        counts = api_upsert_items(server.url, "c1", items, manifest, max_workers=4)
+    assert counts == dict(skipped=9, created=0, updated=1)
+    # the manifest knows the item exists, so it is updated without a POST first
+    assert get_calls(server) == [("PUT", "/collections/c1/items/i4")]
+    assert server.items[("c1", "i4")]["properties"]["a"] == -4
+    assert UpsertManifest(path).entries == manifest.entries
+
+
+def test_upsert_after_server_side_changes():
+    manifest = UpsertManifest()
+    with StandInStacServer() as server:
+        server.items[("c1", "i0")] = dict(id="i0")
+        # unknown to the manifest but existing on the server
+        assert api_upsert_item(server.url, "c1", dict(id="i0", a=1), manifest) == "updated"
+        assert get_calls(server) == [("POST", "/collections/c1/items"), ("PUT", "/collections/c1/items/i0")]
+        server.requests.clear()
+        # known to the manifest but deleted on the server
+        del server.items[("c1", "i0")]
+        assert api_upsert_item(server.url, "c1", dict(id="i0", a=2), manifest) == "created"
+        assert get_calls(server) == [("PUT", "/collections/c1/items/i0"), ("POST", "/collections/c1/items")]
+
+
+def test_upsert_sends_stored_etag():
+    manifest = UpsertManifest()
+    with StandInStacServer() as server:
+        api_upsert_item(server.url, "c1", dict(id="i0", a=1), manifest, l_if_match=True)
+        etag = manifest.get("c1/i0")["etag"]
+        assert etag
+        api_upsert_item(server.url, "c1", dict(id="i0", a=2), manifest, l_if_match=True)
+    assert server.requests[-1][2]["If-Match"] == etag
+
+
+def test_upsert_collection_and_failures():
+    manifest = UpsertManifest()
+    with StandInStacServer() as server:
+        assert api_upsert_collection(server.url, "c1", dict(id="c1"), manifest) == "created"
+        assert api_upsert_collection(server.url, "c1", dict(id="c1"), manifest) == "skipped"
+        server.fail_next["/collections/c1/items"] = [500, 500]
+        with pytest.raises(StacApiError) as excinfo:
+            api_upsert_items(server.url, "c1", make_items(4), manifest, max_workers=1)
+    assert excinfo.value.status_code == 500
+    assert "2 of 4" in str(excinfo.value)
+    # failed items stay unknown, so the next run sends them again
+    assert sorted(manifest.entries) == ["c1", "c1/i2", "c1/i3"]
+
+
+def test_create_or_update_only_updates_on_conflict():
+    with StandInStacServer() as server:
+        api_create_or_update_collection(server.url, "c1", dict(id="c1", title="first"))
+        api_create_or_update_collection(server.url, "c1", dict(id="c1", title="second"))
+        api_create_or_update_item(server.url, "c1", dict(id="i0", a=1))
+        api_create_or_update_item(server.url, "c1", dict(id="i0", a=2))
+        assert server.collections["c1"]["title"] == "second"
+        assert server.items[("c1", "i0")]["a"] == 2
+        server.requests.clear()
+        server.fail_next["/collections/c1/items"] = [500]
+        with pytest.raises(StacApiError) as excinfo:
+            api_create_or_update_item(server.url, "c1", dict(id="i0", a=3))
+    assert excinfo.value.status_code == 500
+    assert get_calls(server) == [("POST", "/collections/c1/items")]
+
+
+def test_rate_limiter():
+    limiter = RateLimiter(50)
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda _: limiter.wait(), range(11)))
+    assert time.monotonic() - start >= 10 / 50
+    start = time.monotonic()
+    for _ in range(100):
+        RateLimiter().wait()
+    assert time.monotonic() - start < 0.1
+
+
+def test_delete_collections_report():
+    with StandInStacServer() as server:
+        server.collections = {cid: dict(id=cid) for cid in ["c1", "c2", "c3"]}
+        server.fail_next["/collections/c3"] = [500]
+        report = api_delete_collections(server.url, ["c1", "c2", "c3", "c4"], max_workers=2, rate_limit=100)
+    assert sorted(report["deleted"]) == ["c1", "c2"]
+    assert report["missing"] == ["c4"]
+    assert list(report["failed"]) == ["c3"]
+    assert report["failed"]["c3"].startswith("500")
+    assert list(server.collections) == ["c3"]
+
+
+def test_delete_all_collections_by_prefix():
+    cids = ["EERIE_a", "eerie_b", "eerieXc", "other"]
+    with StandInStacServer() as server:
+        server.collections = {cid: dict(id=cid) for cid in cids}
+        report = delete_all_collections_by_prefix(server.url, "EERIE_")
+    assert sorted(report["deleted"]) == ["EERIE_a", "eerie_b"]
+    # the stand-in server ignores the filter, the ids are still checked
+    assert sorted(server.collections) == ["eerieXc", "other"]
+    query = server.requests[0][3]
+    assert query["filter"] == ["id LIKE 'EERIE\\_%' OR id LIKE 'eerie\\_%'"]
+    assert query["fields"] == ["id"]
+
+
+def test_iter_collections_follows_next_links():
+    with StandInStacServer() as server:
+        server.collections = {f"c{i:02d}": dict(id=f"c{i:02d}", title="t") for i in range(25)}
+        collections = list(api_iter_collections(server.url, fields=["id"], limit=10))
+        assert [collection["id"] for collection in collections] == sorted(server.collections)
+        assert all(list(collection) == ["id"] for collection in collections)
+        assert len(server.requests) == 3
+        server.requests.clear()
+        # stopping early does not request further pages
+        next(api_iter_collections(server.url, limit=10))
+        assert len(server.requests) == 1
+
+
+def test_iter_collections_without_filter_support():
+    with StandInStacServer() as server:
+        server.collections = {"c1": dict(id="c1")}
+        server.fail_next["/collections"] = [400]
+        collections = list(api_iter_collections(server.url, filter="id LIKE 'c%'"))
+    assert collections == [dict(id="c1")]
+    assert "filter" in server.requests[0][3]
+    assert "filter" not in server.requests[1][3]
+
+
+def test_collection_index_ttl():
+    with StandInStacServer() as server:
+        server.collections = {"c1": dict(id="c1", links=[dict(rel="self", href="c1")], title="t")}
+        index = get_collection_index(server.url)
+        assert index == [dict(id="c1", links=[dict(rel="self", href="c1")])]
+        server.collections["c2"] = dict(id="c2")
+        assert get_collection_index(server.url) == index
+        assert len(server.requests) == 1
+        assert len(get_collection_index(server.url, l_refresh=True)) == 2
+        server.collections["c3"] = dict(id="c3")
+        assert len(get_collection_index(server.url, ttl=0)) == 3
+    assert len(server.requests) == 3
@@ -0,0 +1,186 @@
+"""Tests of the async STAC transaction client against a local stand-in server."""
+
+import asyncio
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+
+from tocatalogs.stac.utils.api_interaction import StacApiError
+from tocatalogs.stac.utils.async_api_interaction import AsyncStacClient, get_retry_after
+
+
+class StandInStacServer:
+    """Minimal in-memory STAC transactions API.
+
+    fail_next maps a path to a list of (status, headers) responses returned
+    before the request is handled normally.
+    """
+
+    def __init__(self, delay: float = 0.0):
+        self.collections = {}
+        self.items = {}
+        self.fail_next = {}
+        self.requests = []
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.app = web.Application(middlewares=[self.middleware])
+        self.app.add_routes(
+            [
+                web.post("/collections", self.create_collection),
+                web.put("/collections/{cid}", self.update_collection),
+                web.delete("/collections/{cid}", self.delete_collection),
+                web.post("/collections/{cid}/items", self.create_item),
+                web.put("/collections/{cid}/items/{iid}", self.update_item),
+                web.delete("/collections/{cid}/items/{iid}", self.delete_item),
+            ]
+        )
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        self.requests.append((request.method, request.path))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            failures = self.fail_next.get(request.path)
+            if failures:
+                status, headers = failures.pop(0)
+                return web.json_response({"detail": "try again"}, status=status, headers=headers)
+            return await handler(request)
+        finally:
+            self.in_flight -= 1
+
+    async def create_collection(self, request):
+        collection = await request.json()
+        if collection["id"] in self.collections:
+            return web.json_response({"detail": "exists"}, status=409)
+        self.collections[collection["id"]] = collection
+        return web.json_response(collection, status=201)
+
+    async def update_collection(self, request):
+        cid = request.match_info["cid"]
+        if cid not in self.collections:
+            return web.json_response({"detail": "not found"}, status=404)
+        self.collections[cid] = await request.json()
+        return web.json_response(self.collections[cid])
+
+    async def delete_collection(self, request):
+        cid = request.match_info["cid"]
+        if self.collections.pop(cid, None) is None:
+            return web.json_response({"detail": "not found"}, status=404)
+        return web.json_response({})
+
+    async def create_item(self, request):
+        cid = request.match_info["cid"]
+        item = await request.json()
+        if (cid, item["id"]) in self.items:
+            return web.json_response({"detail": "exists"}, status=409)
+        self.items[(cid, item["id"])] = item
+        return web.json_response(item, status=201)
+
+    async def update_item(self, request):
+        key = (request.match_info["cid"], request.match_info["iid"])
+        if key not in self.items:
+            return web.json_response({"detail": "not found"}, status=404)
+        self.items[key] = await request.json()
+        return web.json_response(self.items[key])
+
+    async def delete_item(self, request):
+        key = (request.match_info["cid"], request.match_info["iid"])
+        if self.items.pop(key, None) is None:
+            return web.json_response({"detail": "not found"}, status=404)
+        return web.json_response({})
+
+
+async def run_with_server(server, func, **client_kwargs):
+    runner = web.AppRunner(server.app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    client_kwargs.setdefault("backoff_base", 0.01)
+    try:
+        async with AsyncStacClient(f"http://127.0.0.1:{port}", **client_kwargs) as client:
+            return await func(client)
+    finally:
+        await runner.cleanup()
+
+
+def test_create_update_delete():
+    server = StandInStacServer()
+
+    async def scenario(client):
+        await client.create_or_update_collection("c1", {"id": "c1", "title": "first"})
+        await client.create_or_update_collection("c1", {"id": "c1", "title": "second"})
+        await client.create_or_update_item("c1", {"id": "i1", "properties": {"a": 1}})
+        await client.create_or_update_item("c1", {"id": "i1", "properties": {"a": 2}})
+        assert server.items[("c1", "i1")]["properties"]["a"] == 2
+        await client.delete_item("c1", "i1")
+        await client.delete_collection("c1")
+
+    asyncio.run(run_with_server(server, scenario))
+    assert server.collections == {}
+    assert server.items == {}
+
+
+def test_error_status_raises_stac_api_error():
+    server = StandInStacServer()
+
+    async def scenario(client):
+        with pytest.raises(StacApiError) as excinfo:
+            await client.delete_collection("missing")
+        assert excinfo.value.status_code == 404
+        assert isinstance(excinfo.value, ValueError)
+
+    asyncio.run(run_with_server(server, scenario))
+
+
+def test_retry_after_is_honoured():
+    server = StandInStacServer()
+    server.fail_next["/collections"] = [(429, {"Retry-After": "0.2"}), (503, {})]
+
+    async def scenario(client):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await client.create_collection({"id": "c1"})
+        return loop.time() - start
+
+    elapsed = asyncio.run(run_with_server(server, scenario))
+    assert elapsed >= 0.2
+    assert "c1" in server.collections
+    assert server.requests.count(("POST", "/collections")) == 3
+
+
+def test_retries_are_bounded():
+    server = StandInStacServer()
+    server.fail_next["/collections"] = [(503, {})] * 10
+
+    async def scenario(client):
+        with pytest.raises(StacApiError) as excinfo:
+            await client.create_collection({"id": "c1"})
+        assert excinfo.value.status_code == 503
+
+    asyncio.run(run_with_server(server, scenario, max_retries=2))
+    assert server.requests.count(("POST", "/collections")) == 3
+
+
+def test_host_concurrency_limit():
+    server = StandInStacServer(delay=0.02)
+    items = [{"id": f"i{i}"} for i in range(40)]
+
+    async def scenario(client):
+        return await client.create_or_update_items("c1", items)
+
+    errors = asyncio.run(run_with_server(server, scenario, host_concurrency=4))
+    assert errors == {}
+    assert len(server.items) == 40
+    assert server.max_in_flight <= 4
+
+
+def test_get_retry_after():
+    assert get_retry_after("3") == 3.0
+    assert get_retry_after(None) is None
+    assert get_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
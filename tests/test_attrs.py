@@ -0,0 +1,96 @@
+"""Tests of the variable attrs handling of items."""
+
+import copy
+import random
+
+import pytest
+
+from tocatalogs.stac.utils.attrs import deduplicate_variable_attrs, expand_variable_attrs
+
+VALUES = [None, "K", "m", 1, 1.5, True, [1, 2], {"a": None}]
+
+
+def make_cube_variables(rng):
+    keys = [f"k{i}" for i in range(6)]
+    return {
+        f"v{i}": {
+            "type": "data",
+            "attrs": {key: rng.choice(VALUES) for key in rng.sample(keys, rng.randint(0, len(keys)))},
+        }
+        for i in range(rng.randint(1, 8))
+    }
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_dedup_round_trip(seed):
+    cube_variables = make_cube_variables(random.Random(seed))
+    common, diffs, missing = deduplicate_variable_attrs(cube_variables)
+    for name, var in cube_variables.items():
+        assert expand_variable_attrs(common, diffs[name], missing[name]) == var["attrs"]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_eeriecloud_item_round_trip(seed):
+    create_with_eeriecloud = pytest.importorskip("tocatalogs.stac.create_with_eeriecloud")
+    cube_variables = make_cube_variables(random.Random(seed))
+    item = {"properties": {"cube:variables": copy.deepcopy(cube_variables)}}
+    create_with_eeriecloud.clean_eeriecloud_item(item, l_dedup_attrs=True)
+    assert "cube:common_attrs" in item["properties"]
+    create_with_eeriecloud.expand_eeriecloud_item_attrs(item)
+    assert item["properties"]["cube:variables"] == cube_variables
+
+
+def test_common_null_is_kept():
+    cube_variables = {name: {"attrs": {"units": None}} for name in ["a", "b", "c"]}
+    cube_variables["d"] = {"attrs": {}}
+    common, diffs, missing = deduplicate_variable_attrs(cube_variables)
+    assert common == {"units": None}
+    assert missing["d"] == ["units"]
+    assert expand_variable_attrs(common, diffs["a"], missing["a"]) == {"units": None}
+    assert expand_variable_attrs(common, diffs["d"], missing["d"]) == {}
+
+
+def test_split_oversized_attrs():
+    from tocatalogs.stac.utils.attrs import split_oversized_attrs
+
+    attrs = {"history": "x" * 1000, "title": "t", "comment": "y" * 100, "n": 1}
+    assert split_oversized_attrs(attrs) == (attrs, {})
+    kept, externalized = split_oversized_attrs(attrs, max_attr_bytes=500)
+    assert list(externalized) == ["history"]
+    kept, externalized = split_oversized_attrs(attrs, max_attrs_bytes=50)
+    assert set(externalized) == {"history", "comment"}
+    assert {**kept, **externalized} == attrs
+
+
+def test_sidecar_round_trip(tmp_path):
+    import json
+
+    import numpy as np
+
+    xr = pytest.importorskip("xarray")
+    from tocatalogs.stac.xarray_dataset_to_stac_item import xarray_dataset_to_stac_itemdict
+
+    attrs = {"title": "test", "history": "x" * 1000, "source": "model", "embedded": {"a": [1, 2]}}
+    ds = xr.Dataset(dict(ta=(("x",), np.zeros(2))), attrs=attrs)
+    policy = dict(max_attr_bytes=200, sidecar_target=str(tmp_path), sidecar_href="https://host/attrs")
+    item = xarray_dataset_to_stac_itemdict(ds, item_id="test", l_gridlook=False, attrs_policy=policy)
+    asset = item["assets"]["attributes"]
+    assert asset["href"] == "https://host/attrs/test.attrs.json"
+    assert asset["attrs:keys"] == ["history"]
+    assert "history" not in item["properties"]
+    with open(tmp_path / "test.attrs.json") as f:
+        sidecar = json.load(f)
+    assert sidecar == {"history": attrs["history"]}
+    restored = {key: item["properties"][key] for key in attrs if key in item["properties"]}
+    assert {**restored, **sidecar} == attrs
+
+
+def test_item_size_report():
+    from tocatalogs.stac.utils.serialize import get_item_size_report
+
+    items = [{"id": str(i), "p": "x" * i * 10} for i in range(1, 11)]
+    report = get_item_size_report(items, backend="json")
+    assert report["count"] == 10
+    assert report["min"] < report["p50"] < report["max"]
+    assert report["largest"][0] == "10"
+    assert get_item_size_report([]) == dict(count=0)
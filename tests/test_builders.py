@@ -0,0 +1,42 @@
+"""Tests of the pystac and the direct item builder."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+xr = pytest.importorskip("xarray")
+pystac = pytest.importorskip("pystac")
+
+from tocatalogs.stac.xarray_dataset_to_stac_item import (
+    get_item_config,
+    xarray_dataset_to_stac_item,
+    xarray_dataset_to_stac_itemdict,
+)
+
+
+def make_dataset():
+    ds = xr.Dataset(
+        dict(ta=(("time", "lat", "lon"), np.zeros((3, 2, 2), dtype="float32"))),
+        coords=dict(
+            time=pd.date_range("2000-01-01", periods=3, freq="1D"),
+            lat=[0.0, 1.0],
+            lon=[0.0, 1.0],
+        ),
+        attrs=dict(title="test", creation_date="2024-01-01", source_id="ICON", _xpublish_id="test"),
+    )
+    ds.encoding["source"] = "/data/test.zarr"
+    return ds
+
+
+@pytest.mark.parametrize("l_api", [True, False])
+@pytest.mark.parametrize("l_eeriecloud", [True, False])
+def test_pystac_round_trip_matches_direct_builder(l_api, l_eeriecloud):
+    kwargs = dict(collection_id="c", l_eeriecloud=l_eeriecloud, config=get_item_config(l_api=l_api))
+    item = xarray_dataset_to_stac_item(make_dataset(), **kwargs)
+    itemdict = xarray_dataset_to_stac_itemdict(make_dataset(), **kwargs)
+    assert isinstance(item, dict)
+    assert item == itemdict
+    assert pystac.Item.from_dict(item).to_dict() == item
+    assert item["properties"]["start_datetime"] == "2000-01-01T00:00:00Z"
+    assert item["properties"]["datetime"] is None
+    assert ("eerie-cloud" in item["assets"]) == l_eeriecloud
@@ -0,0 +1,64 @@
+"""Tests of the zarr chunk layout reported in cube:variables."""
+
+import numpy as np
+import pytest
+
+xr = pytest.importorskip("xarray")
+
+from tocatalogs.stac.utils.zarr_metadata import get_chunk_layout
+from tocatalogs.stac.xarray_dataset_to_stac_item import (
+    get_cube_dimensions,
+    xarray_dataset_to_stac_itemdict,
+    zarr_metadata_to_stac_item,
+)
+
+
+def make_dataset():
+    return xr.Dataset(
+        dict(ta=(("lat", "lon"), np.zeros((4, 6), dtype="float32"))),
+        coords=dict(lat=[0.0, 1.0, 2.0, 3.0], lon=np.arange(6.0)),
+        attrs=dict(title="test"),
+    )
+
+
+@pytest.mark.parametrize("zarr_format", [2, 3])
+def test_chunk_layout(tmp_path, zarr_format):
+    href = str(tmp_path / "test.zarr")
+    make_dataset().to_zarr(
+        href, zarr_format=zarr_format, consolidated=True, encoding=dict(ta=dict(chunks=(2, 3)))
+    )
+    layout = get_chunk_layout(xr.open_zarr(href)["ta"].variable)
+    assert layout["chunks"] == [2, 3]
+    assert layout["shards"] is None
+    assert layout["chunk_bytes"] == 2 * 3 * 4
+    for item in [
+        xarray_dataset_to_stac_itemdict(xr.open_zarr(href), item_id="t", l_gridlook=False),
+        zarr_metadata_to_stac_item(href, item_id="t", l_gridlook=False),
+    ]:
+        ta = item["properties"]["cube:variables"]["ta"]
+        assert ta["zarr:chunk_shape"] == [2, 3]
+        assert ta["zarr:chunk_bytes"] == 24
+        assert ta["zarr:codecs"]
+
+
+def test_sharded_layout(tmp_path):
+    href = str(tmp_path / "test.zarr")
+    make_dataset().to_zarr(
+        href,
+        zarr_format=3,
+        consolidated=True,
+        encoding=dict(ta=dict(chunks=(1, 3), shards=(2, 6))),
+    )
+    ta = zarr_metadata_to_stac_item(href, item_id="t", l_gridlook=False)["properties"]["cube:variables"]["ta"]
+    assert ta["zarr:chunk_shape"] == [1, 3]
+    assert ta["zarr:shard_shape"] == [2, 6]
+
+
+def test_irregular_axes_have_no_step():
+    ds = make_dataset().assign_coords(lat=[0.0, 1.0, 3.0, 7.0])
+    ds = ds.expand_dims(time=np.array(["2000-01-01", "2000-01-02", "2000-01-05"], dtype="datetime64[ns]"))
+    dimensions = get_cube_dimensions(ds)
+    assert dimensions["lat"]["step"] is None
+    assert dimensions["lon"]["step"] == 1.0
+    assert dimensions["time"]["step"] is None
+    assert dimensions["lat"]["extent"] == [0.0, 7.0]
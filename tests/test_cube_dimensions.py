@@ -0,0 +1,50 @@
+"""Tests of the datacube dimensions of built items."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+xr = pytest.importorskip("xarray")
+
+from tocatalogs.stac.xarray_dataset_to_stac_item import (
+    get_cube_dimensions,
+    xarray_dataset_to_stac_item,
+    xarray_dataset_to_stac_itemdict,
+    zarr_metadata_to_stac_item,
+)
+
+
+def make_dataset():
+    """A member dimension with string labels and ncells without a coordinate."""
+    return xr.Dataset(
+        dict(ta=(("time", "member", "ncells"), np.zeros((4, 2, 5), dtype="float32"))),
+        coords=dict(
+            time=pd.date_range("2000-01-01", periods=4, freq="6h"),
+            member=np.array(["r1", "r2"], dtype=object),
+        ),
+        attrs=dict(title="test"),
+    )
+
+
+def test_get_cube_dimensions():
+    dimensions = get_cube_dimensions(make_dataset())
+    assert dimensions["time"]["step"] == "P0DT6H0M0S"
+    assert dimensions["member"] == dict(type="other", values=["r1", "r2"], size=2)
+    assert dimensions["ncells"] == dict(type="other", extent=[0, 4], step=1, size=5)
+
+
+@pytest.mark.parametrize("builder", [xarray_dataset_to_stac_item, xarray_dataset_to_stac_itemdict])
+def test_builders_with_string_and_coordinateless_dims(builder):
+    item = builder(make_dataset(), item_id="test", collection_id="c", l_gridlook=False)
+    dimensions = item["properties"]["cube:dimensions"]
+    assert set(dimensions) == {"time", "member", "ncells"}
+    assert dimensions["member"]["values"] == ["r1", "r2"]
+
+
+def test_zarr_metadata_with_coordinateless_dim(tmp_path):
+    href = str(tmp_path / "test.zarr")
+    make_dataset().to_zarr(href, zarr_format=2, consolidated=True)
+    item = zarr_metadata_to_stac_item(href, item_id="test", collection_id="c", l_gridlook=False)
+    dimensions = item["properties"]["cube:dimensions"]
+    assert dimensions["ncells"]["size"] == 5
+    assert dimensions["member"]["size"] == 2
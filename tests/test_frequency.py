@@ -0,0 +1,34 @@
+"""Tests of the frequency of built items."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+xr = pytest.importorskip("xarray")
+
+from tocatalogs.stac.xarray_dataset_to_stac_item import set_frequency
+
+
+def make_dataset(periods):
+    return xr.Dataset(
+        dict(ta=("time", np.zeros(periods, dtype="float32"))),
+        coords=dict(time=pd.date_range("2000-01-01", periods=periods, freq="6h")),
+    )
+
+
+@pytest.mark.parametrize(
+    "inp, frequency",
+    [
+        ("eerie.model.atmos.1m.mean", "monthly"),
+        ("eerie.model.atmos.daily", "daily"),
+        # substrings of other words are no keywords
+        ("eerie.model.atmos.gr1mean", "unknown"),
+        ("eerie.model.gridded_output", "unknown"),
+    ],
+)
+def test_keywords_are_whole_tokens(inp, frequency):
+    assert set_frequency(inp, make_dataset(1)).attrs["frequency"] == frequency
+
+
+def test_inferred_frequency_wins():
+    assert set_frequency("eerie.model.atmos.daily", make_dataset(4)).attrs["frequency"] == "6hr"
@@ -0,0 +1,91 @@
+"""Tests of the stac-geoparquet exporter."""
+
+import json
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from tocatalogs.stac.geoparquet import geometry_to_wkb, items_to_geoparquet
+
+
+def make_item(iid, collection, **properties):
+    return dict(
+        type="Feature",
+        stac_version="1.0.0",
+        id=iid,
+        collection=collection,
+        geometry=dict(type="Polygon", coordinates=[[[0, 0], [0, 1], [1, 1], [1, 0], [0, 0]]]),
+        bbox=[0, 0, 1, 1],
+        properties=dict(
+            datetime=None,
+            start_datetime="2020-01-01T00:00:00.123456789Z",
+            end_datetime="2020-12-31T00:00:00Z",
+            variables=["ta", "pr"],
+            **{"cube:variables": {"ta": {"type": "data"}}},
+            **properties,
+        ),
+        links=[dict(rel="self", href=f"{iid}.json")],
+        assets=dict(data=dict(href=f"{iid}.zarr")),
+    )
+
+
+def test_round_trip(tmp_path):
+    items = [
+        make_item("a1", "a", zoom=1),
+        make_item("b1", "b", zoom=2),
+        make_item("a2", "a"),
+    ]
+    path = str(tmp_path / "items.parquet")
+    items_to_geoparquet(items, path, collections=dict(a=dict(id="a")))
+
+    parquet = pq.ParquetFile(path)
+    assert parquet.metadata.num_row_groups == 2
+    assert [parquet.metadata.row_group(i).num_rows for i in range(2)] == [2, 1]
+    metadata = parquet.schema_arrow.metadata
+    geo = json.loads(metadata[b"geo"])
+    assert geo["primary_column"] == "geometry"
+    assert geo["columns"]["geometry"]["geometry_types"] == ["Polygon"]
+    assert json.loads(metadata[b"stac-geoparquet"])["collections"]["a"] == dict(id="a")
+
+    rows = parquet.read().to_pylist()
+    assert [row["id"] for row in rows] == ["a1", "a2", "b1"]
+    assert rows[0]["geometry"] == geometry_to_wkb(items[0]["geometry"])
+    assert rows[0]["start_datetime"].microsecond == 123456
+    assert rows[0]["variables"] == ["ta", "pr"]
+    assert rows[1]["zoom"] is None
+    assert json.loads(rows[0]["cube:variables"]) == {"ta": {"type": "data"}}
+    assert rows[0]["links"] == [dict(rel="self", href="a1.json", type=None, title=None)]
+    assert rows[2]["assets"]["data"] == dict(href="b1.zarr")
+
+
+def test_links_and_assets_are_nested_columns(tmp_path):
+    items = [make_item("a1", "a"), make_item("a2", "a")]
+    items[0]["links"].append(dict(rel="alternate", href="a1.html", type="text/html", method="GET"))
+    items[1]["links"] = []
+    items[1]["assets"]["zoom0"] = {"href": "z0.zarr", "healpix:zoom": 0, "xarray:open_kwargs": {"chunks": {}}}
+    path = str(tmp_path / "items.parquet")
+    items_to_geoparquet(items, path)
+
+    table = pq.read_table(path)
+    assert pa.types.is_list(table.schema.field("links").type)
+    assert pa.types.is_struct(table.schema.field("links").type.value_type)
+    assert pa.types.is_struct(table.schema.field("assets").type)
+    rows = table.to_pylist()
+    assert rows[0]["links"][1] == dict(rel="alternate", href="a1.html", type="text/html", title=None, method="GET")
+    assert rows[1]["links"] == []
+    assert rows[0]["assets"]["zoom0"] is None
+    zoom0 = rows[1]["assets"]["zoom0"]
+    assert zoom0["healpix:zoom"] == 0
+    assert json.loads(zoom0["xarray:open_kwargs"]) == {"chunks": {}}
+
+
+def test_3d_bbox(tmp_path):
+    item = make_item("a1", "a")
+    item["bbox"] = [-10, -20, 0, 10, 20, 100]
+    path = str(tmp_path / "items.parquet")
+    items_to_geoparquet([item], path)
+    parquet = pq.ParquetFile(path)
+    assert parquet.read().to_pylist()[0]["bbox"] == dict(xmin=-10, ymin=-20, xmax=10, ymax=20)
+    assert json.loads(parquet.schema_arrow.metadata[b"geo"])["columns"]["geometry"]["bbox"] == [-10, -20, 10, 20]
@@ -0,0 +1,48 @@
+"""Tests of the gridlook levels of built items."""
+
+import copy
+
+import numpy as np
+import pytest
+
+xr = pytest.importorskip("xarray")
+
+from tocatalogs.stac.xarray_dataset_to_stac_item import (
+    expand_gridlook_levels,
+    get_item_config,
+    xarray_dataset_to_stac_itemdict,
+)
+
+
+def make_dataset():
+    return xr.Dataset(
+        dict(
+            ta=(("lat", "lon"), np.zeros((2, 3))),
+            pr=(("lat", "lon"), np.zeros((2, 3))),
+        ),
+        coords=dict(lat=[0.0, 1.0], lon=[0.0, 1.0, 2.0], height=2.0),
+        attrs=dict(title="test"),
+    )
+
+
+def build(ds, **kwargs):
+    ds.encoding["source"] = "/data/store/test.zarr"
+    config = get_item_config(l_api=False)
+    return xarray_dataset_to_stac_itemdict(ds, item_id="test", config=config, **kwargs)
+
+
+def test_compact_levels_expand_to_full_layout():
+    ds = make_dataset()
+    full = build(ds)
+    compact = build(ds, l_compact_gridlook=True)
+    level = compact["levels"][0]
+    assert level["datasource"] == dict(store="/data/store", dataset="test.zarr")
+    assert level["datasources"] == {}
+    assert set(full["levels"][0]["datasources"]) == set(ds.variables)
+
+    expanded = expand_gridlook_levels(copy.deepcopy(compact), list(ds.variables))
+    assert expanded["levels"] == full["levels"]
+
+    # without the variables, coordinates that are no dimensions are missing
+    expanded = expand_gridlook_levels(copy.deepcopy(compact))
+    assert set(expanded["levels"][0]["datasources"]) == set(ds.variables) - {"height"}
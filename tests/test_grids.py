@@ -0,0 +1,52 @@
+"""Tests of the grid registry shared by item builders."""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+xr = pytest.importorskip("xarray")
+
+from tocatalogs.stac.utils.grids import GridRegistry, get_grid_key
+from tocatalogs.stac.xarray_dataset_to_stac_item import (
+    get_item_config,
+    xarray_dataset_to_stac_itemdict,
+)
+
+
+def make_dataset():
+    """A float32 lat/lon grid with a grid id attribute."""
+    return xr.Dataset(
+        dict(ta=(("lat", "lon"), np.zeros((3, 4), dtype="float32"))),
+        coords=dict(
+            lat=np.array([-10.0, 0.0, 10.0], dtype="float32"),
+            lon=np.array([0.5, 1.5, 2.5, 3.5], dtype="float32"),
+        ),
+        attrs=dict(title="test", uuidOfHGrid="abc"),
+    )
+
+
+def test_registry_caches_float32_grids(tmp_path):
+    path = str(tmp_path / "grids.json")
+    config = get_item_config(grid_registry=GridRegistry(path))
+    item = xarray_dataset_to_stac_itemdict(make_dataset(), item_id="a", l_gridlook=False, config=config)
+    assert item["bbox"] == [0.5, -10.0, 3.5, 10.0]
+    assert item["properties"]["grid:ncells"] == 12
+    with open(path) as f:
+        cached = json.load(f)
+    assert cached[get_grid_key(make_dataset())]["bbox"] == [0.5, -10.0, 3.5, 10.0]
+    assert GridRegistry(path).get("uuidOfHGrid:abc")["ncells"] == 12
+    assert os.listdir(tmp_path) == ["grids.json"]
+
+
+def test_failed_write_removes_tmp_file(tmp_path, monkeypatch):
+    registry = GridRegistry(str(tmp_path / "grids.json"))
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", fail)
+    with pytest.raises(OSError):
+        registry.update("key", ncells=np.int64(1))
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,28 @@
+"""Tests of the vectorised item fields of harvested datasets."""
+
+import numpy as np
+import pytest
+
+xr = pytest.importorskip("xarray")
+
+from tocatalogs.stac.harvest import get_item_ids, harvest_attrs
+from tocatalogs.stac.xarray_dataset_to_stac_item import NEEDED_ATTRS, get_from_attrs, get_item_id
+
+
+def make_dataset(**attrs):
+    return xr.Dataset(dict(ta=(("lat",), np.zeros(3))), coords=dict(lat=[0.0, 1.0, 2.0]), attrs=attrs)
+
+
+def test_item_ids_match_get_item_id(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_dataset(project_id="EERIE", source_id="ICON").to_zarr("a.v1.zarr", zarr_format=2, consolidated=True)
+    make_dataset(source_id="IFS").to_zarr("b.zarr", zarr_format=2, consolidated=True)
+    datasets = [
+        make_dataset(project_id="EERIE", source_id="ICON-ESM-ER", experiment_id="hist", href="x.zarr"),
+        make_dataset(source_id="IFS", frequency="6hr"),
+        xr.open_zarr("a.v1.zarr"),
+    ]
+    df = harvest_attrs([*datasets, "a.v1.zarr", "b.zarr"])
+    datasets += [xr.open_zarr("a.v1.zarr"), xr.open_zarr("b.zarr")]
+    expected = [get_item_id(ds, get_from_attrs(NEEDED_ATTRS, ds), False) for ds in datasets]
+    assert get_item_ids(df).tolist() == expected
@@ -0,0 +1,54 @@
+"""Tests of one item for all zoom levels of a HEALPix pyramid."""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+xr = pytest.importorskip("xarray")
+
+from tocatalogs.stac.xarray_dataset_to_stac_item import healpix_pyramid_to_stac_item
+
+
+def write_zoom(path, zoom, zarr_format):
+    ncells = 12 * 4**zoom
+    ds = xr.Dataset(
+        dict(tas=(("time", "member", "cell"), np.zeros((2, 2, ncells), dtype="float32"))),
+        coords=dict(
+            time=pd.date_range("2000-01-01", periods=2, freq="1D"),
+            member=["r1", "r22"],
+        ),
+        attrs=dict(title="healpix"),
+    )
+    with warnings.catch_warnings():
+        # zarr warns that v3 string data types are not yet specified
+        warnings.simplefilter("ignore")
+        ds.to_zarr(path, zarr_format=zarr_format, consolidated=True)
+
+
+@pytest.mark.parametrize("zarr_format", [2, 3])
+def test_zoom_assets(tmp_path, zarr_format):
+    for zoom in [0, 2]:
+        write_zoom(str(tmp_path / f"hp_z{zoom}.zarr"), zoom, zarr_format)
+    href_template = str(tmp_path / "hp_z{zoom}.zarr")
+    item = healpix_pyramid_to_stac_item(
+        href_template, zooms=range(4), item_id="hp", collection_id="c", l_gridlook=False
+    )
+    properties = item["properties"]
+    assert properties["zoom"] == 2
+    assert properties["healpix:zooms"] == [0, 2]
+    assert properties["cube:dimensions"]["member"]["values"] == ["r1", "r22"]
+    assert item["bbox"] == [-180.0, -90.0, 180.0, 90.0]
+    for zoom in [0, 2]:
+        asset = item["assets"][f"zoom{zoom}"]
+        assert asset["href"] == href_template.format(zoom=zoom)
+        assert asset["healpix:nside"] == 2**zoom
+        assert asset["healpix:ncells"] == 12 * 4**zoom
+        assert asset["healpix:global"]
+    assert "zoom1" not in item["assets"]
+
+
+def test_missing_pyramid(tmp_path):
+    with pytest.raises(ValueError):
+        healpix_pyramid_to_stac_item(str(tmp_path / "hp_z{zoom}.zarr"), zooms=range(2))
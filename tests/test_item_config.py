@@ -0,0 +1,26 @@
+"""Tests of the settings of item generation calls."""
+
+import pytest
+
+pytest.importorskip("xarray")
+
+import tocatalogs.stac.xarray_dataset_to_stac_item as builder
+from tocatalogs.stac.xarray_dataset_to_stac_item import StacItemConfig, get_item_config
+
+
+def test_defaults_follow_module_globals(monkeypatch):
+    assert StacItemConfig() == get_item_config()
+    monkeypatch.setattr(builder, "HOSTURL", "https://example.org/data")
+    monkeypatch.setattr(builder, "L_API", not builder.L_API)
+    monkeypatch.setattr(builder, "HOSTURLS", dict(local="https://example.org/local"))
+    config = StacItemConfig()
+    assert config == get_item_config()
+    assert config.hosturl == "https://example.org/data"
+    assert config.l_api == builder.L_API
+    assert dict(config.hosturls) == dict(local="https://example.org/local")
+
+
+def test_overrides():
+    config = get_item_config(hosturl="https://example.org/data")
+    assert config.hosturl == "https://example.org/data"
+    assert config.id_template == StacItemConfig().id_template
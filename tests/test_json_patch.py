@@ -0,0 +1,27 @@
+"""Tests of the JSON patches sent for item updates."""
+
+from tocatalogs.stac.utils.json_patch import apply_json_patch, make_json_patch
+
+
+def test_patch_round_trip():
+    source = {
+        "id": "a",
+        "properties": {"title": "old", "a/b": 1, "flag": True, "gone": 1},
+        "links": [{"rel": "self"}, {"rel": "parent"}],
+    }
+    target = {
+        "id": "a",
+        "properties": {"title": "new", "a/b": 2, "flag": 1, "added": None},
+        "links": [{"rel": "self"}, {"rel": "parent"}, {"rel": "item"}],
+    }
+    patch = make_json_patch(source, target)
+    assert {"op": "replace", "path": "/properties/a~1b", "value": 2} in patch
+    assert {"op": "add", "path": "/links/-", "value": {"rel": "item"}} in patch
+    assert apply_json_patch(source, patch) == target
+    assert type(apply_json_patch(source, patch)["properties"]["flag"]) is int
+    assert source["properties"]["title"] == "old"
+
+
+def test_equal_documents_give_empty_patch():
+    doc = {"a": [1, 2, {"b": 1.0}]}
+    assert make_json_patch(doc, {"a": [1, 2, {"b": 1.0}]}) == []
@@ -0,0 +1,65 @@
+"""Tests of the JSON encoding of item values."""
+
+import json
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from tocatalogs.stac.utils.serialize import dumps, get_content_hash, to_jsonable
+
+
+def test_to_jsonable():
+    obj = {
+        "f": np.float32(1.5),
+        "i": np.int64(2),
+        "a": np.arange(3),
+        "t": datetime(2000, 1, 1),
+        "d64": np.datetime64("2000-01-01T00:00:00"),
+        "s": {1},
+        1: (b"x",),
+    }
+    assert to_jsonable(obj) == {
+        "f": 1.5,
+        "i": 2,
+        "a": [0, 1, 2],
+        "t": "2000-01-01T00:00:00",
+        "d64": "2000-01-01T00:00:00",
+        "s": [1],
+        "1": ["x"],
+    }
+
+
+@pytest.mark.parametrize("backend", ["json", "orjson"])
+def test_dumps_backends(backend):
+    if backend == "orjson":
+        pytest.importorskip("orjson")
+    obj = {"f": np.float32(1.5), "a": np.arange(2), "t": datetime(2000, 1, 1)}
+    assert json.loads(dumps(obj, backend=backend)) == to_jsonable(obj)
+
+
+def test_content_hash_ignores_key_order():
+    assert get_content_hash({"a": 1, "b": [1, 2]}) == get_content_hash({"b": [1, 2], "a": 1})
+    assert get_content_hash({"a": 1}) != get_content_hash({"a": 2})
+
+
+@pytest.mark.parametrize("unit", ["s", "ms", "ns"])
+def test_datetime_arrays_match_across_backends(unit):
+    pytest.importorskip("orjson")
+    values = np.array(["2000-01-01", "2000-01-01T06:00:00"], dtype=f"datetime64[{unit}]")
+    obj = {"a": values, "b": values.reshape(2, 1), "s": values[0], "d": np.diff(values)}
+    encoded = json.loads(dumps(obj, backend="json"))
+    assert encoded == json.loads(dumps(obj, backend="orjson"))
+    assert encoded["a"] == ["2000-01-01T00:00:00", "2000-01-01T06:00:00"]
+    assert encoded["d"] == ["6:00:00"]
+
+
+def test_nat_is_null():
+    assert to_jsonable(np.array(["NaT"], dtype="datetime64[ns]")) == [None]
+
+
+def test_indent_is_kept():
+    for backend in ["json", "orjson"]:
+        if backend == "orjson":
+            pytest.importorskip("orjson")
+        assert dumps({"a": 1}, backend=backend, indent=4) == '{\n    "a": 1\n}'
@@ -0,0 +1,140 @@
+"""Tests of the static catalog writer."""
+
+import json
+import uuid
+
+import fsspec
+import pytest
+
+from tocatalogs.stac.utils.static import write_static_stac
+
+
+def make_collection(n):
+    items = {f"items/{i}.json": {"id": str(i), "links": []} for i in range(n)}
+    collection = dict(
+        type="Collection",
+        id="c",
+        stac_version="1.0.0",
+        links=[dict(rel="item", href=f"items/{i}.json") for i in range(n)],
+    )
+    return items, collection
+
+
+def write(tmp_path, n, **kwargs):
+    items, collection = make_collection(n)
+    items = {str(tmp_path / path): item for path, item in items.items()}
+    return write_static_stac(items, str(tmp_path / "collection.json"), collection, **kwargs)
+
+
+def read(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def test_default_layout(tmp_path):
+    assert write(tmp_path, 3) == 3
+    collection = read(tmp_path / "collection.json")
+    assert [link["rel"] for link in collection["links"]] == ["item"] * 3
+    assert "\n" in (tmp_path / "collection.json").read_text()
+    assert not (tmp_path / "stac-manifest.json").exists()
+
+
+def assert_links_resolve(path):
+    """All relative hrefs of the file at path and of its children exist."""
+    for link in read(path)["links"]:
+        if "://" in link["href"]:
+            continue
+        target = path.parent / link["href"]
+        assert target.exists(), f"{link} of {path}"
+        if link["rel"] == "child":
+            assert_links_resolve(target)
+
+
+def test_paginated_minified_gzip(tmp_path):
+    write(tmp_path, 5, page_size=2, indent=None, l_gzip=True)
+    collection = read(tmp_path / "collection.json")
+    assert [link["rel"] for link in collection["links"]] == ["child"] * 3
+    page = read(tmp_path / "items" / "page-00002.json")
+    rels = [link["rel"] for link in page["links"]]
+    assert rels == ["root", "parent", "prev", "next", "item", "item"]
+    assert page["links"][4]["href"] == "2.json"
+    assert_links_resolve(tmp_path / "collection.json")
+    assert (tmp_path / "collection.json.gz").exists()
+    assert "\n" not in (tmp_path / "collection.json").read_text()
+
+
+def test_paginated_links_to_collection_and_root(tmp_path):
+    (tmp_path / "catalog.json").write_text(json.dumps(dict(type="Catalog", id="root", links=[])))
+    items, collection = make_collection(3)
+    items = {str(tmp_path / "c" / path): item for path, item in items.items()}
+    collection["links"].append(dict(rel="root", href="../catalog.json"))
+    collection["links"].append(dict(rel="item", href="https://example.org/items/remote.json"))
+    collection_path = tmp_path / "c" / "my-collection.json"
+    write_static_stac(items, str(collection_path), collection, page_size=2)
+    page = read(tmp_path / "c" / "items" / "page-00001.json")
+    assert page["links"][:2] == [
+        dict(rel="root", href="../../catalog.json", type="application/json"),
+        dict(rel="parent", href="../my-collection.json", type="application/json"),
+    ]
+    last = read(tmp_path / "c" / "items" / "page-00002.json")
+    assert last["links"][-1]["href"] == "https://example.org/items/remote.json"
+    assert_links_resolve(collection_path)
+
+
+def test_failed_item_does_not_publish(tmp_path):
+    items, collection = make_collection(2)
+    items = {str(tmp_path / path): item for path, item in items.items()}
+    # a directory in place of an item file makes its write fail
+    (tmp_path / "bad.json").mkdir()
+    items[str(tmp_path / "bad.json")] = {"id": "bad"}
+    with pytest.raises(ValueError):
+        write_static_stac(items, str(tmp_path / "collection.json"), collection)
+    assert not (tmp_path / "collection.json").exists()
+
+
+def test_incremental_rebuild(tmp_path):
+    assert write(tmp_path, 4, l_incremental=True) == 4
+    mtime = (tmp_path / "collection.json").stat().st_mtime_ns
+    assert write(tmp_path, 4, l_incremental=True) == 0
+    assert (tmp_path / "collection.json").stat().st_mtime_ns == mtime
+    assert write(tmp_path, 3, l_incremental=True) == 0
+    assert not (tmp_path / "items" / "3.json").exists()
+    assert len(read(tmp_path / "collection.json")["links"]) == 3
+    assert len(read(tmp_path / "stac-manifest.json")["files"]) == 4
+
+
+def test_incremental_rewrites_changed_items(tmp_path):
+    items, collection = make_collection(4)
+    items = {str(tmp_path / path): item for path, item in items.items()}
+    collection_path = str(tmp_path / "collection.json")
+    assert write_static_stac(items, collection_path, collection, l_incremental=True) == 4
+    mtimes = {path: (tmp_path / path).stat().st_mtime_ns for path in ["items/0.json", "collection.json"]}
+    items[str(tmp_path / "items" / "2.json")]["title"] = "changed"
+    assert write_static_stac(items, collection_path, collection, l_incremental=True) == 1
+    assert read(tmp_path / "items" / "2.json")["title"] == "changed"
+    assert {path: (tmp_path / path).stat().st_mtime_ns for path in mtimes} == mtimes
+
+
+def test_incremental_format_change_rewrites_all(tmp_path):
+    assert write(tmp_path, 4, l_incremental=True) == 4
+    assert write(tmp_path, 4, l_incremental=True, indent=None, l_gzip=True) == 4
+    assert "\n" not in (tmp_path / "items" / "0.json").read_text()
+    assert (tmp_path / "items" / "0.json.gz").exists()
+    assert read(tmp_path / "stac-manifest.json")["format"] == dict(indent=None, gzip=True)
+    assert write(tmp_path, 4, l_incremental=True, indent=None, l_gzip=True) == 0
+
+
+def test_parallel_batches_on_memory_fs():
+    root = f"memory://static-{uuid.uuid4().hex}"
+    items, collection = make_collection(25)
+    items = {f"{root}/{path}": item for path, item in items.items()}
+    written = write_static_stac(
+        items, f"{root}/collection.json", collection, max_workers=4, batch_size=3, l_incremental=True
+    )
+    assert written == 25
+    fs = fsspec.filesystem("memory")
+    assert len(fs.ls(f"{root}/items")) == 25
+    with fs.open(f"{root}/items/24.json") as f:
+        assert json.load(f)["id"] == "24"
+    assert fs.exists(f"{root}/stac-manifest.json")
+    fs.rm(root, recursive=True)
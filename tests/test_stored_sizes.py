@@ -0,0 +1,55 @@
+"""Tests of the stored volume of zarr stores."""
+
+import os
+
+import numpy as np
+import pytest
+
+xr = pytest.importorskip("xarray")
+
+from tocatalogs.stac.utils import zarr_metadata
+from tocatalogs.stac.utils.zarr_metadata import get_stored_sizes
+
+
+def write_store(path):
+    ds = xr.Dataset(dict(ta=(("x",), np.random.default_rng(0).random(100))), attrs=dict(title="test"))
+    ds.to_zarr(path, zarr_format=2, consolidated=True, encoding=dict(ta=dict(chunks=(30,))))
+    return path
+
+
+def get_chunk_files(href, name):
+    directory = os.path.join(href, name)
+    return [fn for fn in os.listdir(directory) if not fn.startswith(".")]
+
+
+def test_stored_sizes_of_native_store(tmp_path):
+    href = write_store(str(tmp_path / "test.zarr"))
+    files = get_chunk_files(href, "ta")
+    sizes = get_stored_sizes(href, ["ta"])
+    assert sizes["ta"]["chunks"] == len(files) == 4
+    assert sizes["ta"]["bytes"] == sum(os.path.getsize(os.path.join(href, "ta", fn)) for fn in files)
+
+
+def test_stored_sizes_are_cached(tmp_path, monkeypatch):
+    href = write_store(str(tmp_path / "test.zarr"))
+    zarr_metadata._get_stored_sizes.cache_clear()
+    first = get_stored_sizes(href, ["ta"])
+    calls = []
+    monkeypatch.setattr(zarr_metadata, "_get_listed_sizes", lambda *args: calls.append(args))
+    first["ta"]["bytes"] = 0
+    second = get_stored_sizes(href, ["ta"])
+    assert calls == []
+    assert second["ta"]["bytes"] > 0
+    assert zarr_metadata._get_stored_sizes.cache_info().hits == 1
+
+
+def test_stored_sizes_of_json_references():
+    references = {
+        ".zgroup": "{}",
+        "ta/.zarray": "{}",
+        "ta/0": ["file.nc", 0, 100],
+        "ta/1": ["file.nc", 100, 50],
+        "ta/2": "base64:AAAA",
+    }
+    sizes = zarr_metadata._get_json_reference_sizes(references, ["ta"])
+    assert sizes["ta"] == dict(bytes=100 + 50 + len("base64:AAAA"), chunks=3)
@@ -0,0 +1,45 @@
+"""Tests of the time axis summary of built items."""
+
+import pandas as pd
+
+from tocatalogs.stac.utils.time_axis import find_time_gaps, get_time_axis_summary, infer_frequency
+
+
+def test_regular_axis():
+    index = pd.date_range("2000-01-01", periods=100, freq="6h")
+    summary = get_time_axis_summary(index)
+    assert summary["frequency"] == "6hr"
+    assert summary["step"] == 6 * 3600
+    assert summary["missing_steps"] == 0
+    assert summary["gaps"] == []
+
+
+def test_gaps():
+    index = pd.date_range("2000-01-01", periods=100, freq="1h").delete([10, 11, 50])
+    gaps = find_time_gaps(index, step=3600, chunk_size=16)
+    assert gaps["missing_steps"] == 3
+    assert gaps["gaps"][0] == [index[9], index[10]]
+
+
+def test_monthly_axis():
+    index = pd.date_range("2000-01-01", periods=24, freq="MS")
+    assert infer_frequency(index) == dict(frequency="monthly", step=None)
+    assert get_time_axis_summary(index.delete(5))["missing_steps"] == 1
+
+
+def test_nat_is_ignored():
+    index = pd.DatetimeIndex(list(pd.date_range("2000-01-01", periods=10, freq="1D")) + [pd.NaT])
+    summary = get_time_axis_summary(index)
+    assert summary["frequency"] == "daily"
+    assert summary["missing_steps"] == 0
+
+    index = pd.date_range("2000-01-01", periods=10, freq="1D").insert(5, pd.NaT).delete(6)
+    summary = get_time_axis_summary(index)
+    assert summary["frequency"] == "daily"
+    assert summary["missing_steps"] == 1
+
+
+def test_single_timestamp_has_no_frequency():
+    index = pd.DatetimeIndex(["2000-01-01", pd.NaT])
+    assert infer_frequency(index) == dict()
+    assert get_time_axis_summary(index) == dict()
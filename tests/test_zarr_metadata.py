@@ -0,0 +1,130 @@
+"""Tests of items built from consolidated zarr metadata only."""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+xr = pytest.importorskip("xarray")
+
+from tocatalogs.stac.utils.zarr_metadata import get_numpy_dtype, read_consolidated_metadata
+from tocatalogs.stac.xarray_dataset_to_stac_item import (
+    get_item_config,
+    open_dataset_spec,
+    xarray_dataset_to_stac_itemdict,
+    xarray_zarr_datasets_to_stac_item,
+    zarr_metadata_to_stac_item,
+)
+
+
+def make_dataset():
+    """Time, lat and lon plus a string member coordinate."""
+    return xr.Dataset(
+        dict(ta=(("time", "member", "lat", "lon"), np.zeros((4, 2, 3, 4), dtype="float32"))),
+        coords=dict(
+            time=pd.date_range("2000-01-01", periods=4, freq="1D"),
+            member=["r1", "r22"],
+            lat=[-10.0, 0.0, 10.0],
+            lon=[0.0, 90.0, 180.0, 270.0],
+            label=("lon", np.array([b"a", b"bb", b"c", b"d"])),
+        ),
+        attrs=dict(title="test", project_id="EERIE"),
+    )
+
+
+def write_store(path, zarr_format):
+    with warnings.catch_warnings():
+        # zarr warns that v3 string data types are not yet specified
+        warnings.simplefilter("ignore")
+        make_dataset().to_zarr(path, zarr_format=zarr_format, consolidated=True)
+    return path
+
+
+def without_timestamps(item):
+    properties = {
+        key: value for key, value in item["properties"].items() if key not in ["created", "datetime"]
+    }
+    return dict(item, properties=properties)
+
+
+@pytest.mark.parametrize(
+    "dtype,expected",
+    [
+        ({"name": "fixed_length_utf32", "configuration": {"length_bytes": 12}}, np.dtype("<U3")),
+        ({"name": "null_terminated_bytes", "configuration": {"length_bytes": 2}}, np.dtype("S2")),
+        ({"name": "numpy.datetime64", "configuration": {"unit": "s", "scale_factor": 1}}, np.dtype("M8[s]")),
+        ("string", np.dtype(object)),
+        ("float32", np.dtype("float32")),
+        ("<f8", np.dtype("float64")),
+        ("r16", np.dtype("V2")),
+        ({"name": "unknown.extension"}, np.dtype(object)),
+    ],
+)
+def test_get_numpy_dtype(dtype, expected):
+    assert get_numpy_dtype(dtype) == expected
+
+
+@pytest.mark.parametrize("zarr_format", [2, 3])
+def test_metadata_item_matches_xarray_item(tmp_path, zarr_format):
+    href = write_store(str(tmp_path / "test.zarr"), zarr_format)
+    assert read_consolidated_metadata(href)["zarr_format"] == zarr_format
+    from_metadata = zarr_metadata_to_stac_item(href, item_id="test", l_gridlook=False)
+    from_xarray = xarray_dataset_to_stac_itemdict(xr.open_zarr(href), item_id="test", l_gridlook=False)
+    assert without_timestamps(from_metadata) == without_timestamps(from_xarray)
+    assert from_metadata["properties"]["cube:dimensions"]["member"]["values"] == ["r1", "r22"]
+
+
+def open_store(path):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return xr.open_zarr(path)
+
+
+@pytest.mark.parametrize("zarr_format", [2, 3])
+def test_open_dataset_spec(tmp_path, zarr_format):
+    href = write_store(str(tmp_path / "test.zarr"), zarr_format)
+    ds = open_store(href)
+    assert open_dataset_spec(ds) is ds
+    from_href = open_dataset_spec(href)
+    assert set(from_href.variables) == set(ds.variables)
+    from_dict = open_dataset_spec(
+        dict(href=href, storage_options=dict(anon=True), open_kwargs=dict(chunks={})), coords=[]
+    )
+    assert from_dict.attrs["open_storage_options"] == dict(anon=True)
+    assert from_dict.attrs["open_kwargs"] == dict(chunks={})
+
+
+@pytest.mark.parametrize("zarr_format", [2, 3])
+def test_assets_from_specs(tmp_path, zarr_format):
+    primary = write_store(str(tmp_path / "primary.zarr"), zarr_format)
+    cloud = write_store(str(tmp_path / "cloud.zarr"), zarr_format)
+    archive = write_store(str(tmp_path / "archive.zarr"), zarr_format)
+    item = xarray_zarr_datasets_to_stac_item(
+        {
+            "dkrz-disk": open_store(primary),
+            "dkrz-cloud": cloud,
+            "archive": dict(href=archive, storage_options=dict(anon=True)),
+        },
+        item_id="test",
+        collection_id="c",
+        config=get_item_config(l_api=False),
+    )
+    assets = item["assets"]
+    assert assets["dkrz-disk"]["href"] == "file://" + primary
+    assert assets["dkrz-cloud"]["href"] == cloud
+    assert assets["dkrz-tape"]["href"] == archive
+    assert item["properties"]["cube:dimensions"]["member"]["values"] == ["r1", "r22"]
+
+
+def test_mismatching_alternate(tmp_path):
+    primary = write_store(str(tmp_path / "primary.zarr"), 3)
+    other = str(tmp_path / "other.zarr")
+    make_dataset().isel(time=slice(0, 2)).to_zarr(other, zarr_format=2, consolidated=True)
+    dset_dict = {"dkrz-disk": open_store(primary), "dkrz-cloud": other}
+    with pytest.raises(ValueError, match="does not match"):
+        xarray_zarr_datasets_to_stac_item(dset_dict, item_id="test", collection_id="c")
+    item = xarray_zarr_datasets_to_stac_item(
+        dset_dict, item_id="test", collection_id="c", l_check_alternates=False
+    )
+    assert item["assets"]["dkrz-cloud"]["href"] == other